@@ -47,21 +47,21 @@ matcher = on_message(rule=Rule(_is_group), priority=50, block=False)
 @dataclass(frozen=True)
 class _MemberCacheEntry:
     expires_at: float
-    member_ids: set[int]
+    member_ids: frozenset[int]
 
 
 _member_cache: dict[int, _MemberCacheEntry] = {}
 _MEMBER_CACHE_TTL_SECONDS = 3600
 
 
-async def _get_group_member_ids(bot: Bot, group_id: int) -> set[int]:
+async def _get_group_member_ids(bot: Bot, group_id: int) -> frozenset[int]:
     now = time.monotonic()
     cached = _member_cache.get(group_id)
     if cached and cached.expires_at > now:
         return cached.member_ids
 
     members = await bot.call_api("get_group_member_list", group_id=group_id)
-    member_ids = {int(m["user_id"]) for m in members}
+    member_ids = frozenset(int(m["user_id"]) for m in members)
     _member_cache[group_id] = _MemberCacheEntry(
         expires_at=now + _MEMBER_CACHE_TTL_SECONDS,
         member_ids=member_ids,
@@ -123,16 +123,17 @@ async def handle(bot: Bot, event: GroupMessageEvent):
         return
 
     member_ids = await _get_group_member_ids(bot, int(event.group_id))
-    targets_in_group = [qq for qq in sorted(targets) if qq in member_ids]
-    if not targets_in_group:
+    matched = targets & member_ids
+    if not matched:
         return
+    targets_in_group = sorted(matched) if len(matched) > 1 else list(matched)
 
-    msg = Message()
+    segments: list[MessageSegment] = []
     for qq in targets_in_group:
-        msg += MessageSegment.at(qq)
-        msg += MessageSegment.text(" ")
+        segments.append(MessageSegment.at(qq))
+        segments.append(MessageSegment.text(" "))
 
-    await matcher.send(msg)
+    await matcher.send(Message(segments))
 
 
 @ping_add_cmd.handle()
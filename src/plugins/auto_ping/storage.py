@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import functools
 import json
 from pathlib import Path
+from typing import Callable, Iterable
 
+import ahocorasick
 import nonebot_plugin_localstore as store
 
 
@@ -40,11 +43,73 @@ def normalize_alias(alias: str) -> str:
     return normalized
 
 
+@functools.lru_cache(maxsize=64)
+def _casefold(text: str) -> str:
+    """Casefold message text, reusing results for recently repeated messages."""
+    return text.casefold()
+
+
+@functools.lru_cache(maxsize=1)
+def _casefold_sources() -> dict[str, frozenset[str]]:
+    """Map each character to the characters whose casefold contains it.
+
+    Built on first use rather than at import: the scan covers every codepoint
+    and is only needed once there are aliases to index.
+    """
+    sources: dict[str, set[str]] = {}
+    # Every character with a non-identity casefold lives below U+20000.
+    for codepoint in range(0x20000):
+        char = chr(codepoint)
+        folded = char.casefold()
+        if folded == char:
+            continue
+        for folded_char in folded:
+            sources.setdefault(folded_char, set()).add(char)
+    return {char: frozenset(chars) for char, chars in sources.items()}
+
+
+def _build_first_char_filter(aliases: Iterable[str]) -> frozenset[str]:
+    """Collect raw characters that could start an alias match after casefolding."""
+    first_chars: set[str] = set()
+    for alias in aliases:
+        first_char = alias[0]
+        first_chars.add(first_char)
+        first_chars.update(_casefold_sources().get(first_char, ()))
+    return frozenset(first_chars)
+
+
+def _build_alias_matcher(alias_to_qq: dict[str, int]) -> Callable[[str], set[int]]:
+    """Build an Aho-Corasick matcher over casefolded aliases.
+
+    Scanning stops once every alias owner has been matched.
+    """
+    if not alias_to_qq:
+        return lambda normalized_text: set()
+
+    owner_count = len(set(alias_to_qq.values()))
+    automaton = ahocorasick.Automaton()
+    for alias, qq in alias_to_qq.items():
+        automaton.add_word(alias, qq)
+    automaton.make_automaton()
+
+    def match_automaton(normalized_text: str) -> set[int]:
+        targets: set[int] = set()
+        for _, qq in automaton.iter(normalized_text):
+            targets.add(qq)
+            if len(targets) == owner_count:
+                break
+        return targets
+
+    return match_automaton
+
+
 class AliasRegistry:
     def __init__(self, file_path: Path | None = None):
         self.file_path = file_path or get_data_file()
         self._alias_to_qq: dict[str, int] = {}
         self._aliases_by_qq: dict[int, tuple[str, ...]] = {}
+        self._matcher: Callable[[str], set[int]] = _build_alias_matcher({})
+        self._first_chars: frozenset[str] = frozenset()
         self.load()
 
     def load(self) -> None:
@@ -61,6 +126,7 @@ class AliasRegistry:
 
         self._alias_to_qq = alias_to_qq
         self._aliases_by_qq = aliases_by_qq
+        self._index_aliases()
 
     def _parse_data(self, data: object) -> tuple[dict[str, int], dict[int, tuple[str, ...]]]:
         alias_to_qq: dict[str, int] = {}
@@ -100,6 +166,10 @@ class AliasRegistry:
 
         return alias_to_qq, aliases_by_qq
 
+    def _index_aliases(self) -> None:
+        self._matcher = _build_alias_matcher(self._alias_to_qq)
+        self._first_chars = _build_first_char_filter(self._alias_to_qq)
+
     def _save(self) -> None:
         payload = {
             "targets": {
@@ -144,6 +214,7 @@ class AliasRegistry:
 
         self._aliases_by_qq = aliases_by_qq
         self._alias_to_qq = alias_to_qq
+        self._index_aliases()
         self._save()
 
     def remove_alias(self, alias: str) -> int:
@@ -165,16 +236,14 @@ class AliasRegistry:
 
         self._aliases_by_qq = aliases_by_qq
         self._alias_to_qq = alias_to_qq
+        self._index_aliases()
         self._save()
         return owner_qq
 
     def match_targets(self, plain_text: str) -> set[int]:
         if not plain_text or not self._alias_to_qq:
             return set()
+        if self._first_chars.isdisjoint(plain_text):
+            return set()
 
-        normalized_text = plain_text.casefold()
-        return {
-            qq
-            for alias, qq in self._alias_to_qq.items()
-            if alias and alias in normalized_text
-        }
+        return self._matcher(_casefold(plain_text))
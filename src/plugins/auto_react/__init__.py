@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import random
 from pathlib import Path
@@ -20,6 +21,8 @@ from .user_storage import UserStorage
 
 require("nonebot_plugin_localstore")
 
+EMOJI_LIKE_IDS: tuple[int, ...] = tuple(sorted(emoji_like_id_set))
+
 DATA_FILE: Path = store.get_data_file(plugin_name="nonebot_plugin_auto_react", filename="target_users.json")
 user_storage = UserStorage(DATA_FILE)
 
@@ -31,8 +34,9 @@ __plugin_meta__ = PluginMetadata(
 )
 
 
-async def target_user(event: Event):
-    return user_storage.has_user(event.get_user_id())
+# Kept as a coroutine: nonebot runs sync rule callables through run_sync (a worker thread).
+async def target_user(event: Event) -> bool:
+    return event.get_user_id() in user_storage.frozen_users
 
 
 matcher = on_message(
@@ -44,7 +48,7 @@ matcher = on_message(
 @matcher.handle()
 async def handle(bot: Bot, event: GroupMessageEvent):
     try:
-        emoji_id = random.choice(list(emoji_like_id_set))
+        emoji_id = random.choice(EMOJI_LIKE_IDS)
 
         await bot.call_api(
             "set_msg_emoji_like",  # OneBot协议标准API
@@ -68,7 +72,7 @@ async def handle_add(event: MessageEvent, args: Message = CommandArg()):
     if not user_id.isdigit():
         await add_cmd.finish("[!] 用户ID 应该只包含数字")
     
-    if user_storage.add_user(user_id):
+    if await asyncio.to_thread(user_storage.add_user, user_id):
         await add_cmd.finish(f"[+] 已添加用户 {user_id}")
     else:
         await add_cmd.finish(f"[!] 用户 {user_id} 已存在")
@@ -80,7 +84,7 @@ async def handle_remove(event: MessageEvent, args: Message = CommandArg()):
     if not user_id.isdigit():
         await remove_cmd.finish("[!] 用户ID 应该只包含数字")
     
-    if user_storage.remove_user(user_id):
+    if await asyncio.to_thread(user_storage.remove_user, user_id):
         await remove_cmd.finish(f"[-] 已移除用户 {user_id}")
     else:
         await remove_cmd.finish(f"[!] 用户 {user_id} 不存在")
@@ -1,9 +1,21 @@
 import json
+import os
+import threading
 from pathlib import Path
-from typing import Set
+from typing import FrozenSet, Set, TextIO
+
+import orjson
+
+# 日志超过该行数后合并回 JSON 快照
+LOG_COMPACT_THRESHOLD = 1000
+
 
 class UserStorage:
-    """简单的用户ID存储装置"""
+    """简单的用户ID存储装置
+
+    JSON 文件保存快照，每次增删只向同名 .log 文件追加一行（+id / -id），
+    启动时或日志过长时再合并回快照。
+    """
     
     def __init__(self, file_path: Path):
         """
@@ -13,11 +25,18 @@ class UserStorage:
             file_path: 数据文件路径
         """
         self.file_path = file_path
+        self.log_path = file_path.with_suffix(".log")
         self._users: Set[str] = set()
+        self.frozen_users: FrozenSet[str] = frozenset()
+        self._log: TextIO | None = None
+        self._log_lines = 0
+        # 日志重放失败时为 True，此时合并快照也不能删除日志
+        self._log_unreplayed = False
+        self._lock = threading.Lock()
         self._load()
     
     def _load(self) -> None:
-        """从文件读取用户ID列表"""
+        """从快照读取用户ID列表，并重放追加日志"""
         if self.file_path.exists():
             try:
                 with open(self.file_path, 'r', encoding='utf-8') as f:
@@ -27,12 +46,54 @@ class UserStorage:
                 self._users = set()
         else:
             self._users = set()
+
+        if self.log_path.exists():
+            try:
+                with open(self.log_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        op, user_id = line[:1], line[1:].strip()
+                        if not user_id:
+                            continue
+                        if op == "+":
+                            self._users.add(user_id)
+                        elif op == "-":
+                            self._users.discard(user_id)
+            except (OSError, UnicodeDecodeError):
+                # 读不出的日志原样保留，下次启动再重放
+                self._log_unreplayed = True
+            else:
+                self.compact()
+
+        self.frozen_users = frozenset(self._users)
     
     def _save(self) -> None:
-        """将用户ID列表保存到文件"""
+        """将用户ID列表保存到文件（先写临时文件再替换）"""
+        data = orjson.dumps(sorted(self._users), option=orjson.OPT_INDENT_2)
+
         self.file_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.file_path, 'w', encoding='utf-8') as f:
-            json.dump(sorted(list(self._users)), f, ensure_ascii=False, indent=2)
+        tmp_path = self.file_path.with_suffix(self.file_path.suffix + '.tmp')
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, self.file_path)
+
+    def _append(self, op: str, user_id: str) -> None:
+        """向日志追加一条变更，必要时触发合并"""
+        if self._log is None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            self._log = open(self.log_path, 'a', encoding='utf-8', buffering=1)
+        self._log.write(f"{op}{user_id}\n")
+        self._log_lines += 1
+        if self._log_lines >= LOG_COMPACT_THRESHOLD:
+            self.compact()
+
+    def compact(self) -> None:
+        """将当前用户集合写回快照并清空日志"""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        self._save()
+        if not self._log_unreplayed:
+            self.log_path.unlink(missing_ok=True)
+        self._log_lines = 0
     
     def add_user(self, user_id: str) -> bool:
         """
@@ -44,11 +105,13 @@ class UserStorage:
         Returns:
             是否添加成功（新增的情况）
         """
-        if user_id not in self._users:
-            self._users.add(user_id)
-            self._save()
-            return True
-        return False
+        with self._lock:
+            if user_id not in self._users:
+                self._users.add(user_id)
+                self.frozen_users = frozenset(self._users)
+                self._append("+", user_id)
+                return True
+            return False
     
     def remove_user(self, user_id: str) -> bool:
         """
@@ -60,11 +123,13 @@ class UserStorage:
         Returns:
             是否删除成功
         """
-        if user_id in self._users:
-            self._users.remove(user_id)
-            self._save()
-            return True
-        return False
+        with self._lock:
+            if user_id in self._users:
+                self._users.remove(user_id)
+                self.frozen_users = frozenset(self._users)
+                self._append("-", user_id)
+                return True
+            return False
     
     def has_user(self, user_id: str) -> bool:
         """
@@ -76,7 +141,7 @@ class UserStorage:
         Returns:
             用户是否存在
         """
-        return user_id in self._users
+        return user_id in self.frozen_users
     
     def get_all_users(self) -> Set[str]:
         """
@@ -85,9 +150,12 @@ class UserStorage:
         Returns:
             用户ID集合
         """
-        return self._users.copy()
+        with self._lock:
+            return self._users.copy()
     
     def clear_all(self) -> None:
         """清空所有用户ID"""
-        self._users.clear()
-        self._save()
+        with self._lock:
+            self._users.clear()
+            self.frozen_users = frozenset()
+            self.compact()
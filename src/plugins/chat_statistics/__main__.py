@@ -1,4 +1,8 @@
 import re
+import time
+from dataclasses import dataclass
+from typing import Optional
+
 from nonebot import on_command
 from nonebot.rule import is_type, to_me
 from nonebot.adapters.onebot.v11 import GroupMessageEvent
@@ -6,14 +10,81 @@ from nonebot.params import CommandArg
 from nonebot.adapters.onebot.v11 import Message, MessageSegment
 from nonebot.exception import FinishedException
 
-from .statistics import get_user_chat_statistics, get_user_active_statistics
+from .statistics import (
+    ActiveStatistics,
+    ChatStatistics,
+    get_user_combined_statistics,
+    has_message_records,
+)
 from .visualization import generate_combined_chart
 
 
+_AT_RE = re.compile(r'\[CQ:at,qq=(\d+)(?:,[^\]]*)?\]')
+
+
 def extract_at_users(raw_message: str) -> list[str]:
     """Extract user IDs from CQ at codes in raw message"""
-    pattern = r'\[CQ:at,qq=(\d+)(?:,.*?)?\]'
-    return re.findall(pattern, raw_message)
+    return _AT_RE.findall(raw_message)
+
+
+@dataclass(frozen=True)
+class _StatisticsCacheEntry:
+    expires_at: float
+    chat_stats: ChatStatistics
+    active_stats: ActiveStatistics
+    chart_bytes: Optional[bytes]
+
+
+# Absorb repeated `ttd chat` invocations for the same target and range.
+# Entries hold a rendered PNG, so keep only a handful; insertion order is
+# expiry order because every entry gets the same TTL.
+_statistics_cache: dict[tuple[str, str, int, str], _StatisticsCacheEntry] = {}
+_STATISTICS_CACHE_TTL_SECONDS = 60
+_STATISTICS_CACHE_MAX_SIZE = 32
+
+# Upper bound for the days argument of `ttd chat`
+MAX_DAYS = 365
+
+
+def _store_statistics(key: tuple[str, str, int, str], entry: _StatisticsCacheEntry) -> None:
+    # Re-insert at the end so the oldest entry is always first
+    _statistics_cache.pop(key, None)
+    now = time.monotonic()
+    while _statistics_cache:
+        oldest_key = next(iter(_statistics_cache))
+        if (_statistics_cache[oldest_key].expires_at > now
+                and len(_statistics_cache) < _STATISTICS_CACHE_MAX_SIZE):
+            break
+        del _statistics_cache[oldest_key]
+    _statistics_cache[key] = entry
+
+
+async def _get_statistics(user_id: str, group_id: str, days: int, user_display: str) -> _StatisticsCacheEntry:
+    """Get statistics and rendered chart for a user, reusing results younger than the TTL"""
+    key = (user_id, group_id, days, user_display)
+    now = time.monotonic()
+    cached = _statistics_cache.get(key)
+    if cached:
+        if cached.expires_at > now:
+            return cached
+        del _statistics_cache[key]
+
+    if await has_message_records(user_id, group_id, days):
+        chat_stats, active_stats = await get_user_combined_statistics(user_id, group_id, days)
+        chart_bytes = await generate_combined_chart(chat_stats, active_stats, user_display)
+    else:
+        # Nothing to fetch or draw, reply with the "no records" text
+        chat_stats = ChatStatistics(user_id, group_id, days)
+        active_stats = ActiveStatistics(user_id, group_id, days)
+        chart_bytes = None
+    entry = _StatisticsCacheEntry(
+        expires_at=now + _STATISTICS_CACHE_TTL_SECONDS,
+        chat_stats=chat_stats,
+        active_stats=active_stats,
+        chart_bytes=chart_bytes,
+    )
+    _store_statistics(key, entry)
+    return entry
 
 
 # Create command handler
@@ -35,6 +106,7 @@ async def handle_chat_statistics(event: GroupMessageEvent, args: Message = Comma
             if days <= 0:
                 await chat_cmd.finish("天数必须大于0")
                 return
+            days = min(days, MAX_DAYS)
     except ValueError:
         await chat_cmd.finish("请输入有效的天数")
         return
@@ -53,21 +125,17 @@ async def handle_chat_statistics(event: GroupMessageEvent, args: Message = Comma
         user_display = "您"
     
     try:
-        # Get both statistics for the target user
-        chat_stats = await get_user_chat_statistics(target_user_id, group_id, days)
-        active_stats = await get_user_active_statistics(target_user_id, group_id, days)
-        
-        # Try to generate combined chart image
-        chart_bytes = await generate_combined_chart(chat_stats, active_stats, user_display)
+        # Get both statistics and the combined chart for the target user
+        result = await _get_statistics(target_user_id, group_id, days, user_display)
         
-        if chart_bytes is None:
+        if result.chart_bytes is None:
             # Fallback to text if image generation failed
-            chat_text = chat_stats.format_text_output(user_display)
-            active_text = active_stats.format_text_output(user_display)
+            chat_text = result.chat_stats.format_text_output(user_display)
+            active_text = result.active_stats.format_text_output(user_display)
             await chat_cmd.finish(f"{chat_text}\n\n{active_text}")
         else:
             # Send image
-            image_segment = MessageSegment.image(chart_bytes)
+            image_segment = MessageSegment.image(result.chart_bytes)
             await chat_cmd.finish(image_segment)
         
     except FinishedException:
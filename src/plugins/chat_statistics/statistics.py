@@ -1,13 +1,97 @@
 import datetime
-from collections import defaultdict
-from typing import Dict
+from typing import AsyncIterator, Dict, Iterable, List, Sequence, Set, Tuple
 
+import numpy as np
 from nonebot import require
 
+require("nonebot_plugin_orm")
 require("nonebot_plugin_chatrecorder")
 require("nonebot_plugin_uninfo")
 
-from nonebot_plugin_chatrecorder import get_message_records
+from nonebot_plugin_chatrecorder import MessageRecord
+from nonebot_plugin_chatrecorder.record import filter_statement
+from nonebot_plugin_orm import get_session
+from nonebot_plugin_uninfo.orm import BotModel, SceneModel, SessionModel, UserModel
+from sqlalchemy import Select, func, select
+
+
+# China Standard Time (UTC+8) offset used for bucketing
+_LOCAL_OFFSET_SECONDS = 8 * 3600
+_UTC = datetime.timezone.utc
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def _utc_timestamp(message_time: datetime.datetime) -> float:
+    """Get POSIX timestamp of a message time (naive times are treated as UTC)"""
+    if message_time.tzinfo is None:
+        message_time = message_time.replace(tzinfo=_UTC)
+    return message_time.timestamp()
+
+
+def _to_local_epoch(message_time: datetime.datetime) -> int:
+    """Convert a message time to UTC+8 epoch seconds"""
+    return int(_utc_timestamp(message_time) // 1) + _LOCAL_OFFSET_SECONDS
+
+
+def _to_local_epochs(message_times: Iterable[datetime.datetime]) -> np.ndarray:
+    """Convert message times to UTC+8 epoch seconds"""
+    timestamps = np.fromiter(map(_utc_timestamp, message_times), dtype=np.float64)
+    return np.floor(timestamps).astype(np.int64) + _LOCAL_OFFSET_SECONDS
+
+
+# Number of message times fetched from the database per round trip
+_RECORD_CHUNK_SIZE = 4096
+
+
+def _select_records(*columns, **filters) -> Select:
+    """Select columns of message records matching chatrecorder filters"""
+    return (
+        select(*columns)
+        .where(*filter_statement(**filters))
+        .join(SessionModel, SessionModel.id == MessageRecord.session_persist_id)
+        .join(BotModel, BotModel.id == SessionModel.bot_persist_id)
+        .join(SceneModel, SceneModel.id == SessionModel.scene_persist_id)
+        .join(UserModel, UserModel.id == SessionModel.user_persist_id)
+    )
+
+
+async def _iter_message_time_chunks(
+    chunk_size: int = _RECORD_CHUNK_SIZE, **filters
+) -> AsyncIterator[Sequence[datetime.datetime]]:
+    """Stream message times matching chatrecorder filters in fixed-size chunks
+
+    Only the time column is selected, so no MessageRecord objects are built and
+    at most `chunk_size` times are held in memory at once.
+    """
+    statement = _select_records(MessageRecord.time, **filters).execution_options(
+        yield_per=chunk_size
+    )
+    async with get_session() as db_session:
+        result = await db_session.stream_scalars(statement)
+        async for chunk in result.partitions(chunk_size):
+            yield chunk
+
+
+async def _get_hourly_buckets(**filters) -> List[Tuple[str, datetime.datetime, int]]:
+    """Count messages per user and UTC hour in the database
+
+    Returns (user_id, UTC hour start, message count) rows. Bucketing by UTC
+    hour keeps the query portable; the UTC+8 shift is applied to the rows.
+    """
+    time_column = MessageRecord.time
+    year = func.extract("year", time_column).label("year")
+    month = func.extract("month", time_column).label("month")
+    day = func.extract("day", time_column).label("day")
+    hour = func.extract("hour", time_column).label("hour")
+    statement = _select_records(
+        UserModel.user_id, year, month, day, hour, func.count(), **filters
+    ).group_by(UserModel.user_id, year, month, day, hour)
+    async with get_session() as db_session:
+        rows = (await db_session.execute(statement)).all()
+    return [
+        (user_id, datetime.datetime(int(y), int(m), int(d), int(h), tzinfo=_UTC), count)
+        for user_id, y, m, d, h, count in rows
+    ]
 
 
 class ChatStatistics:
@@ -17,34 +101,42 @@ class ChatStatistics:
         self.user_id = user_id
         self.group_id = group_id
         self.days = days
-        self.hourly_distribution: Dict[int, int] = defaultdict(int)
+        # Message count per local hour, indexed by hour (0-23)
+        self.hourly_distribution: List[int] = [0] * 24
         self.total_messages = 0
-        self.start_time = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
-        self.end_time = datetime.datetime.now(datetime.timezone.utc)
+        self.start_time = datetime.datetime.now(_UTC) - datetime.timedelta(days=days)
+        self.end_time = datetime.datetime.now(_UTC)
     
     def add_message(self, message_time: datetime.datetime):
         """Add a message to the statistics"""
-        # Convert UTC time to local time (UTC+8)
-        if message_time.tzinfo is None:
-            # If naive datetime, assume it's UTC
-            message_time = message_time.replace(tzinfo=datetime.timezone.utc)
-        
-        # Convert to UTC+8 (China Standard Time)
-        local_tz = datetime.timezone(datetime.timedelta(hours=8))
-        local_time = message_time.astimezone(local_tz)
-        hour = local_time.hour
-        
+        hour = _to_local_epoch(message_time) // 3600 % 24
         self.hourly_distribution[hour] += 1
         self.total_messages += 1
+
+    def add_messages(self, message_times: Iterable[datetime.datetime]):
+        """Add a batch of messages to the statistics in one vectorized pass"""
+        epochs = _to_local_epochs(message_times)
+        if not epochs.size:
+            return
+
+        counts = np.bincount(epochs // 3600 % 24, minlength=24)
+        self.hourly_distribution = [
+            current + count
+            for current, count in zip(self.hourly_distribution, counts.tolist())
+        ]
+        self.total_messages += int(epochs.size)
+
+    def add_hourly_count(self, hour_start: datetime.datetime, count: int):
+        """Add `count` messages sent within the hour starting at `hour_start`"""
+        hour = _to_local_epoch(hour_start) // 3600 % 24
+        self.hourly_distribution[hour] += count
+        self.total_messages += count
     
-    def get_hourly_percentages(self) -> Dict[int, float]:
-        """Get hourly distribution as percentages"""
+    def get_hourly_percentages(self) -> List[float]:
+        """Get hourly distribution as percentages, indexed by hour"""
         if self.total_messages == 0:
-            return {}
-        return {
-            hour: (count / self.total_messages * 100)
-            for hour, count in self.hourly_distribution.items()
-        }
+            return [0.0] * 24
+        return [count / self.total_messages * 100 for count in self.hourly_distribution]
     
     def format_text_output(self, user_display: str = None) -> str:
         """Format statistics as text for display"""
@@ -53,12 +145,10 @@ class ChatStatistics:
             return f"{user_part}过去{self.days}天无聊天记录"
         
         percentages = self.get_hourly_percentages()
-        lines = []
-        
-        for hour in range(24):
-            count = self.hourly_distribution.get(hour, 0)
-            percentage = percentages.get(hour, 0)
-            lines.append(f"{hour:2d}h: {count:3d} ({percentage:4.1f}%)")
+        lines = [
+            f"{hour:2d}h: {count:3d} ({percentage:4.1f}%)"
+            for hour, (count, percentage) in enumerate(zip(self.hourly_distribution, percentages))
+        ]
         
         user_part = f"{user_display}的" if user_display else ""
         header = f"{user_part}过去{self.days}天聊天分布 (共{self.total_messages}条消息)"
@@ -73,8 +163,8 @@ class ChatStatistics:
             "total_messages": self.total_messages,
             "start_time": self.start_time.isoformat(),
             "end_time": self.end_time.isoformat(),
-            "hourly_distribution": dict(self.hourly_distribution),
-            "hourly_percentages": self.get_hourly_percentages()
+            "hourly_distribution": dict(enumerate(self.hourly_distribution)),
+            "hourly_percentages": dict(enumerate(self.get_hourly_percentages()))
         }
 
 
@@ -85,56 +175,52 @@ class ActiveStatistics:
         self.user_id = user_id
         self.group_id = group_id
         self.days = days
-        # Track active days for each hour: hour -> set of active dates
-        self.hourly_active_days: Dict[int, set] = defaultdict(set)
-        self.start_time = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
-        self.end_time = datetime.datetime.now(datetime.timezone.utc)
+        # Track active days for each hour, indexed by hour (0-23): set of active dates
+        self.hourly_active_days: List[Set[datetime.date]] = [set() for _ in range(24)]
+        self.start_time = datetime.datetime.now(_UTC) - datetime.timedelta(days=days)
+        self.end_time = datetime.datetime.now(_UTC)
     
     def add_message(self, message_time: datetime.datetime):
         """Add a message to the statistics (marks the hour as active for that date)"""
-        # Convert UTC time to local time (UTC+8)
-        if message_time.tzinfo is None:
-            # If naive datetime, assume it's UTC
-            message_time = message_time.replace(tzinfo=datetime.timezone.utc)
-        
-        # Convert to UTC+8 (China Standard Time)
-        local_tz = datetime.timezone(datetime.timedelta(hours=8))
-        local_time = message_time.astimezone(local_tz)
-        hour = local_time.hour
-        
+        local_epoch = _to_local_epoch(message_time)
         # Use date only (ignore time) to track unique active days
-        date = local_time.date()
-        self.hourly_active_days[hour].add(date)
+        date = datetime.date.fromordinal(_EPOCH_ORDINAL + local_epoch // 86400)
+        self.hourly_active_days[local_epoch // 3600 % 24].add(date)
+
+    def add_messages(self, message_times: Iterable[datetime.datetime]):
+        """Add a batch of messages to the statistics in one vectorized pass"""
+        epochs = _to_local_epochs(message_times)
+        if not epochs.size:
+            return
+
+        hour_day_pairs = np.unique(np.stack([epochs // 3600 % 24, epochs // 86400]), axis=1)
+        for hour, day in hour_day_pairs.T.tolist():
+            self.hourly_active_days[hour].add(datetime.date.fromordinal(_EPOCH_ORDINAL + day))
     
-    def get_hourly_active_counts(self) -> Dict[int, int]:
-        """Get count of active days for each hour"""
-        return {hour: len(days) for hour, days in self.hourly_active_days.items()}
+    def get_hourly_active_counts(self) -> List[int]:
+        """Get count of active days for each hour, indexed by hour"""
+        return [len(days) for days in self.hourly_active_days]
     
-    def get_hourly_percentages(self) -> Dict[int, float]:
-        """Get hourly activity as percentages of total days"""
+    def get_hourly_percentages(self) -> List[float]:
+        """Get hourly activity as percentages of total days, indexed by hour"""
         if self.days == 0:
-            return {}
-        return {
-            hour: (len(days) / self.days * 100)
-            for hour, days in self.hourly_active_days.items()
-        }
+            return [0.0] * 24
+        return [len(days) / self.days * 100 for days in self.hourly_active_days]
     
     def format_text_output(self, user_display: str = None) -> str:
         """Format statistics as text for display"""
         active_counts = self.get_hourly_active_counts()
-        total_active_hours = len([h for h, count in active_counts.items() if count > 0])
+        total_active_hours = sum(1 for count in active_counts if count > 0)
         
         if total_active_hours == 0:
             user_part = f"{user_display}的" if user_display else ""
             return f"{user_part}过去{self.days}天无活跃记录"
         
         percentages = self.get_hourly_percentages()
-        lines = []
-        
-        for hour in range(24):
-            count = active_counts.get(hour, 0)
-            percentage = percentages.get(hour, 0)
-            lines.append(f"{hour:2d}h: {count:3d} ({percentage:5.1f}%)")
+        lines = [
+            f"{hour:2d}h: {count:3d} ({percentage:5.1f}%)"
+            for hour, (count, percentage) in enumerate(zip(active_counts, percentages))
+        ]
         
         user_part = f"{user_display}的" if user_display else ""
         header = f"{user_part}过去{self.days}天活跃时间分布 (共{total_active_hours}个活跃小时)"
@@ -142,69 +228,107 @@ class ActiveStatistics:
     
     def to_dict(self) -> dict:
         """Convert to dictionary for JSON serialization"""
+        active_counts = self.get_hourly_active_counts()
         return {
             "user_id": self.user_id,
             "group_id": self.group_id,
             "days": self.days,
             "start_time": self.start_time.isoformat(),
             "end_time": self.end_time.isoformat(),
-            "hourly_active_counts": self.get_hourly_active_counts(),
-            "hourly_percentages": self.get_hourly_percentages(),
-            "total_active_hours": len([h for h, c in self.get_hourly_active_counts().items() if c > 0])
+            "hourly_active_counts": dict(enumerate(active_counts)),
+            "hourly_percentages": dict(enumerate(self.get_hourly_percentages())),
+            "total_active_hours": sum(1 for c in active_counts if c > 0)
         }
 
 
+async def has_message_records(user_id: str, group_id: str, days: int) -> bool:
+    """Check whether a user sent any message in a group over the past N days"""
+    
+    # Calculate time range - use UTC as required by chatrecorder
+    end_time = datetime.datetime.now(_UTC)
+    start_time = end_time - datetime.timedelta(days=days)
+    
+    statement = _select_records(
+        MessageRecord.id,
+        user_ids=[user_id],
+        scene_ids=[group_id],
+        time_start=start_time,
+        time_stop=end_time,
+        types=["message"]
+    ).limit(1)
+    async with get_session() as db_session:
+        return (await db_session.scalar(statement)) is not None
+
+
 async def get_user_chat_statistics(user_id: str, group_id: str, days: int) -> ChatStatistics:
     """Get chat statistics for a user in a specific group over the past N days"""
     
     stats = ChatStatistics(user_id, group_id, days)
     
     # Calculate time range - use UTC as required by chatrecorder
-    end_time = datetime.datetime.now(datetime.timezone.utc)
+    end_time = datetime.datetime.now(_UTC)
     start_time = end_time - datetime.timedelta(days=days)
     
-    # Get message records using the chatrecorder interface
-    records = await get_message_records(
+    # Stream message times and fold each chunk into the statistics
+    async for message_times in _iter_message_time_chunks(
         user_ids=[user_id],
         scene_ids=[group_id],
         time_start=start_time,
         time_stop=end_time,
         types=["message"]
-    )
-    
-    # Process the messages to build statistics
-    for record in records:
-        stats.add_message(record.time)
+    ):
+        stats.add_messages(message_times)
     
     return stats
 
 
+async def get_user_combined_statistics(
+    user_id: str, group_id: str, days: int
+) -> Tuple[ChatStatistics, ActiveStatistics]:
+    """Get chat and active statistics for a user from a single pass over the records"""
+    
+    chat_stats = ChatStatistics(user_id, group_id, days)
+    active_stats = ActiveStatistics(user_id, group_id, days)
+    
+    # Calculate time range - use UTC as required by chatrecorder
+    end_time = datetime.datetime.now(_UTC)
+    start_time = end_time - datetime.timedelta(days=days)
+    
+    # Stream message times once and feed each chunk to both aggregators
+    async for message_times in _iter_message_time_chunks(
+        user_ids=[user_id],
+        scene_ids=[group_id],
+        time_start=start_time,
+        time_stop=end_time,
+        types=["message"]
+    ):
+        chat_stats.add_messages(message_times)
+        active_stats.add_messages(message_times)
+    
+    return chat_stats, active_stats
+
+
 async def get_group_chat_statistics(group_id: str, days: int) -> Dict[str, ChatStatistics]:
     """Get chat statistics for all users in a group over the past N days"""
     
     # Calculate time range - use UTC as required by chatrecorder
-    end_time = datetime.datetime.now(datetime.timezone.utc)
+    end_time = datetime.datetime.now(_UTC)
     start_time = end_time - datetime.timedelta(days=days)
     
     user_stats: Dict[str, ChatStatistics] = {}
     
-    # Get all message records for the group in the time range
-    records = await get_message_records(
+    # Let the database count messages per user and hour
+    buckets = await _get_hourly_buckets(
         scene_ids=[group_id],
         time_start=start_time,
         time_stop=end_time,
         types=["message"]
     )
     
-    # Process records
-    for record in records:
-        # Extract user_id from the record
-        user_id = record.user_id
-        
+    for user_id, hour_start, count in buckets:
         if user_id not in user_stats:
             user_stats[user_id] = ChatStatistics(user_id, group_id, days)
-        
-        user_stats[user_id].add_message(record.time)
+        user_stats[user_id].add_hourly_count(hour_start, count)
     
     return user_stats
 
@@ -215,21 +339,18 @@ async def get_user_active_statistics(user_id: str, group_id: str, days: int) ->
     stats = ActiveStatistics(user_id, group_id, days)
     
     # Calculate time range - use UTC as required by chatrecorder
-    end_time = datetime.datetime.now(datetime.timezone.utc)
+    end_time = datetime.datetime.now(_UTC)
     start_time = end_time - datetime.timedelta(days=days)
     
-    # Get message records using the chatrecorder interface
-    records = await get_message_records(
+    # Stream message times and fold each chunk into the statistics
+    async for message_times in _iter_message_time_chunks(
         user_ids=[user_id],
         scene_ids=[group_id],
         time_start=start_time,
         time_stop=end_time,
         types=["message"]
-    )
-    
-    # Process the messages to build statistics
-    for record in records:
-        stats.add_message(record.time)
+    ):
+        stats.add_messages(message_times)
     
     return stats
 
@@ -238,27 +359,22 @@ async def get_group_active_statistics(group_id: str, days: int) -> Dict[str, Act
     """Get active time statistics for all users in a group over the past N days"""
     
     # Calculate time range - use UTC as required by chatrecorder
-    end_time = datetime.datetime.now(datetime.timezone.utc)
+    end_time = datetime.datetime.now(_UTC)
     start_time = end_time - datetime.timedelta(days=days)
     
     user_stats: Dict[str, ActiveStatistics] = {}
     
-    # Get all message records for the group in the time range
-    records = await get_message_records(
+    # Let the database collapse messages to one row per user and hour
+    buckets = await _get_hourly_buckets(
         scene_ids=[group_id],
         time_start=start_time,
         time_stop=end_time,
         types=["message"]
     )
     
-    # Process records
-    for record in records:
-        # Extract user_id from the record
-        user_id = record.user_id
-        
+    for user_id, hour_start, _ in buckets:
         if user_id not in user_stats:
             user_stats[user_id] = ActiveStatistics(user_id, group_id, days)
-        
-        user_stats[user_id].add_message(record.time)
+        user_stats[user_id].add_message(hour_start)
     
-    return user_stats
\ No newline at end of file
+    return user_stats
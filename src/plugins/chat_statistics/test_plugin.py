@@ -15,7 +15,8 @@ class MockChatStatistics:
         self.user_id = user_id
         self.group_id = group_id
         self.days = days
-        self.hourly_distribution = {}
+        # Message count per hour, indexed by hour (0-23), like ChatStatistics
+        self.hourly_distribution = [0] * 24
         self.total_messages = 0
         self.start_time = datetime.datetime.now() - datetime.timedelta(days=days)
         self.end_time = datetime.datetime.now()
@@ -44,7 +45,7 @@ class MockChatStatistics:
         
         for hour, count in patterns.items():
             self.hourly_distribution[hour] = count
-            self.total_messages += count
+        self.total_messages = sum(self.hourly_distribution)
     
     def format_text_output(self):
         """Format as text output"""
@@ -55,8 +56,7 @@ class MockChatStatistics:
         header = f"过去{self.days}天聊天分布 (共{self.total_messages}条消息)"
         lines.append(header)
         
-        for hour in range(24):
-            count = self.hourly_distribution.get(hour, 0)
+        for hour, count in enumerate(self.hourly_distribution):
             percentage = (count / self.total_messages * 100) if self.total_messages > 0 else 0
             lines.append(f"{hour:2d}h: {count:3d} ({percentage:4.1f}%)")
         
@@ -84,13 +84,17 @@ def test_basic_functionality():
     print()
     
     print("3. Peak Activity Analysis:")
-    if stats.hourly_distribution:
-        peak_hour = max(stats.hourly_distribution, key=stats.hourly_distribution.get)
-        peak_count = stats.hourly_distribution[peak_hour]
+    if stats.total_messages:
+        # Find peak and quiet hours in a single pass
+        peak_hour = peak_count = -1
+        quiet_hours = []
+        for h, count in enumerate(stats.hourly_distribution):
+            if count > peak_count:
+                peak_count, peak_hour = count, h
+            if count == 0:
+                quiet_hours.append(h)
         print(f"   Peak Hour: {peak_hour}:00 ({peak_count} messages)")
         
-        # Find quiet hours
-        quiet_hours = [h for h in range(24) if stats.hourly_distribution.get(h, 0) == 0]
         if quiet_hours:
             print(f"   Quiet Hours: {', '.join(f'{h}:00' for h in quiet_hours[:5])}")
         else:
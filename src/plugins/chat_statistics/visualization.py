@@ -5,22 +5,78 @@ This module provides chart generation functionality for chat statistics.
 """
 
 import asyncio
+import math
 from functools import partial
 from io import BytesIO
 from typing import Optional
 import concurrent.futures
 
+import numpy as np
+
 try:
-    import matplotlib.pyplot as plt
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
     MATPLOTLIB_AVAILABLE = True
 except ImportError:
     MATPLOTLIB_AVAILABLE = False
 
+_HOURS = tuple(range(24))
+
+# Charts are only viewed in chat, so render at screen resolution and
+# favour PNG encode speed over the last few percent of file size
+_CHART_DPI = 100
+_PNG_OPTIONS = {'compress_level': 1}
+
+
+def _gradient_colors(base, light):
+    """Blend base towards light per hour (12pm brightest, 0am/24pm darkest)"""
+    colors = []
+    for hour in _HOURS:
+        # Brightness factor: 12pm = 1.0 (brightest), 0am/24pm = 0.3 (darkest)
+        brightness = 0.3 + 0.7 * (1 + math.cos(2 * math.pi * (hour - 12) / 24)) / 2
+        weight = (brightness - 0.3) / 0.7
+        colors.append(tuple(b + (l - b) * weight for b, l in zip(base, light)))
+    return tuple(colors)
+
+
+# Hourly palettes are fixed, so compute them once at import
+_CHAT_COLORS = _gradient_colors((0x4A/255, 0x90/255, 0xE2/255), (0.8, 0.95, 1.0))  # #4A90E2 -> light blue-white
+_ACTIVE_COLORS = _CHAT_COLORS
+_COMBINED_CHAT_COLORS = _gradient_colors((0x34/255, 0x98/255, 0xDB/255), (0.7, 0.9, 1.0))  # #3498DB -> light blue-white
+_COMBINED_ACTIVE_COLORS = _gradient_colors((0xE7/255, 0x4C/255, 0x3C/255), (1.0, 0.8, 0.8))  # #E74C3C -> light red-white
+
 from .statistics import ChatStatistics, ActiveStatistics
 
+# Shared render thread; font registration and rcParams are process-global
+# matplotlib state, so charts are rendered one at a time off the event loop
+_CHART_EXECUTOR: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """Get the shared chart rendering executor, creating it on first use"""
+    global _CHART_EXECUTOR
+    if _CHART_EXECUTOR is None:
+        _CHART_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="chart")
+    return _CHART_EXECUTOR
+
+
+# Result of the one-time font registration; None until first attempted
+_FONT_READY: Optional[bool] = None
+
 
 def setup_chinese_font():
     """Setup Chinese font for matplotlib - only use bundled font or fail"""
+    global _FONT_READY
+    if _FONT_READY is not None:
+        return _FONT_READY
+    _FONT_READY = _register_chinese_font()
+    return _FONT_READY
+
+
+def _register_chinese_font() -> bool:
+    """Register the bundled font and make it the matplotlib default"""
     if not MATPLOTLIB_AVAILABLE:
         return False
     
@@ -39,8 +95,8 @@ def setup_chinese_font():
         
         # Use font properties directly
         font_prop = font_manager.FontProperties(fname=str(font_path))
-        plt.rcParams['font.family'] = font_prop.get_name()
-        plt.rcParams['axes.unicode_minus'] = False
+        matplotlib.rcParams['font.family'] = font_prop.get_name()
+        matplotlib.rcParams['axes.unicode_minus'] = False
         return True
     except Exception:
         return False
@@ -57,38 +113,20 @@ def _generate_chat_chart(stats: ChatStatistics, user_display: str = None) -> Opt
     
     # Prepare data
     hours = list(range(24))
-    counts = [stats.hourly_distribution.get(h, 0) for h in hours]
+    counts = np.asarray(stats.hourly_distribution, dtype=np.int64)
+    user_part = f"{user_display}的" if user_display else ""
+    title = f'{user_part}过去{stats.days}天聊天分布 (共{stats.total_messages}条消息)'
     
     # Create figure
-    fig, ax = plt.subplots(figsize=(12, 6))
-    
-    # Create gradient colors based on hour (12pm brightest, 0am/24pm darkest)
-    # Calculate brightness factor for each hour (sine wave peaking at 12)
-    import math
-    colors = []
-    for hour in hours:
-        # Create brightness factor: 12pm = 1.0 (brightest), 0am/24pm = 0.3 (darkest)
-        brightness = 0.3 + 0.7 * (1 + math.cos(2 * math.pi * (hour - 12) / 24)) / 2
-        
-        # Apply brightness to base color #4A90E2
-        base_r, base_g, base_b = 0x4A/255, 0x90/255, 0xE2/255
-        
-        # Blend with lighter version for brightness
-        light_r, light_g, light_b = 0.8, 0.95, 1.0  # Light blue-white
-        
-        r = base_r + (light_r - base_r) * (brightness - 0.3) / 0.7
-        g = base_g + (light_g - base_g) * (brightness - 0.3) / 0.7  
-        b = base_b + (light_b - base_b) * (brightness - 0.3) / 0.7
-        
-        colors.append((r, g, b))
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
     
     # Create bar chart with gradient colors
-    bars = ax.bar(hours, counts, color=colors, alpha=0.9, edgecolor='#2E5C8A', linewidth=1)
+    ax.bar(hours, counts, color=_CHAT_COLORS, alpha=0.9, edgecolor='#2E5C8A', linewidth=1)
     
     # Customize chart
-    user_part = f"{user_display}的" if user_display else ""
-    ax.set_title(f'{user_part}过去{stats.days}天聊天分布 (共{stats.total_messages}条消息)', 
-                 fontsize=16, fontweight='bold', pad=20)
+    ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
     ax.set_xlabel('小时', fontsize=12)
     ax.set_ylabel('消息数量', fontsize=12)
     
@@ -96,26 +134,24 @@ def _generate_chat_chart(stats: ChatStatistics, user_display: str = None) -> Opt
     ax.set_xticks(hours)
     ax.set_xticklabels([f'{h:02d}' for h in hours])
     
-    # Add value labels on bars
-    for bar, count in zip(bars, counts):
-        if count > 0:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + max(counts) * 0.01,
-                   f'{count}', ha='center', va='bottom', fontsize=9)
+    # Add value labels on non-empty bars (bars are centred on their hour)
+    label_offset = counts.max() * 0.01
+    for hour in np.flatnonzero(counts).tolist():
+        count = int(counts[hour])
+        ax.text(hour, count + label_offset, f'{count}', ha='center', va='bottom', fontsize=9)
     
     # Style
     ax.grid(True, alpha=0.3, axis='y')
     ax.set_axisbelow(True)
     
     # Tight layout
-    plt.tight_layout()
+    fig.tight_layout()
     
     # Save to bytes
     img_buffer = BytesIO()
-    plt.savefig(img_buffer, format='PNG', dpi=150, bbox_inches='tight')
-    plt.close(fig)
-    
-    img_buffer.seek(0)
+    fig.savefig(img_buffer, format='PNG', dpi=_CHART_DPI, bbox_inches='tight',
+                pil_kwargs=_PNG_OPTIONS)
+    # getvalue() hands back the buffer's own bytes object without another copy
     return img_buffer.getvalue()
 
 
@@ -130,41 +166,22 @@ def _generate_active_chart(stats: ActiveStatistics, user_display: str = None) ->
     
     # Prepare data
     hours = list(range(24))
-    active_counts = stats.get_hourly_active_counts()
-    counts = [active_counts.get(h, 0) for h in hours]
-    percentages = [stats.get_hourly_percentages().get(h, 0) for h in hours]
+    counts = np.asarray(stats.get_hourly_active_counts(), dtype=np.int64)
+    percentages = stats.get_hourly_percentages()
+    total_active_hours = int(np.count_nonzero(counts))
+    user_part = f"{user_display}的" if user_display else ""
+    title = f'{user_part}过去{stats.days}天活跃时间分布 (共{total_active_hours}个活跃小时)'
     
     # Create figure
-    fig, ax = plt.subplots(figsize=(12, 6))
-    
-    # Create gradient colors based on hour (12pm brightest, 0am/24pm darkest)
-    # Calculate brightness factor for each hour (sine wave peaking at 12)
-    import math
-    colors = []
-    for hour in hours:
-        # Create brightness factor: 12pm = 1.0 (brightest), 0am/24pm = 0.3 (darkest)
-        brightness = 0.3 + 0.7 * (1 + math.cos(2 * math.pi * (hour - 12) / 24)) / 2
-        
-        # Apply brightness to base color #4A90E2
-        base_r, base_g, base_b = 0x4A/255, 0x90/255, 0xE2/255
-        
-        # Blend with lighter version for brightness
-        light_r, light_g, light_b = 0.8, 0.95, 1.0  # Light blue-white
-        
-        r = base_r + (light_r - base_r) * (brightness - 0.3) / 0.7
-        g = base_g + (light_g - base_g) * (brightness - 0.3) / 0.7  
-        b = base_b + (light_b - base_b) * (brightness - 0.3) / 0.7
-        
-        colors.append((r, g, b))
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
     
     # Create bar chart with gradient colors
-    bars = ax.bar(hours, counts, color=colors, alpha=0.9, edgecolor='#2E5C8A', linewidth=1)
+    ax.bar(hours, counts, color=_ACTIVE_COLORS, alpha=0.9, edgecolor='#2E5C8A', linewidth=1)
     
     # Customize chart
-    total_active_hours = len([h for h, count in active_counts.items() if count > 0])
-    user_part = f"{user_display}的" if user_display else ""
-    ax.set_title(f'{user_part}过去{stats.days}天活跃时间分布 (共{total_active_hours}个活跃小时)', 
-                 fontsize=16, fontweight='bold', pad=20)
+    ax.set_title(title, fontsize=16, fontweight='bold', pad=20)
     ax.set_xlabel('小时', fontsize=12)
     ax.set_ylabel('活跃天数', fontsize=12)
     
@@ -172,26 +189,25 @@ def _generate_active_chart(stats: ActiveStatistics, user_display: str = None) ->
     ax.set_xticks(hours)
     ax.set_xticklabels([f'{h:02d}' for h in hours])
     
-    # Add value labels on bars
-    for bar, count, pct in zip(bars, counts, percentages):
-        if count > 0:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + max(counts) * 0.01,
-                   f'{count}\n({pct:.1f}%)', ha='center', va='bottom', fontsize=9)
+    # Add value labels on non-empty bars (bars are centred on their hour)
+    label_offset = counts.max() * 0.01
+    for hour in np.flatnonzero(counts).tolist():
+        count = int(counts[hour])
+        ax.text(hour, count + label_offset, f'{count}\n({percentages[hour]:.1f}%)',
+                ha='center', va='bottom', fontsize=9)
     
     # Style
     ax.grid(True, alpha=0.3, axis='y')
     ax.set_axisbelow(True)
     
     # Tight layout
-    plt.tight_layout()
+    fig.tight_layout()
     
     # Save to bytes
     img_buffer = BytesIO()
-    plt.savefig(img_buffer, format='PNG', dpi=150, bbox_inches='tight')
-    plt.close(fig)
-    
-    img_buffer.seek(0)
+    fig.savefig(img_buffer, format='PNG', dpi=_CHART_DPI, bbox_inches='tight',
+                pil_kwargs=_PNG_OPTIONS)
+    # getvalue() hands back the buffer's own bytes object without another copy
     return img_buffer.getvalue()
 
 
@@ -202,9 +218,7 @@ async def generate_chat_chart(stats: ChatStatistics, user_display: str = None) -
     
     loop = asyncio.get_running_loop()
     pfunc = partial(_generate_chat_chart, stats, user_display)
-    
-    with concurrent.futures.ThreadPoolExecutor() as pool:
-        return await loop.run_in_executor(pool, pfunc)
+    return await loop.run_in_executor(_get_executor(), pfunc)
 
 
 async def generate_active_chart(stats: ActiveStatistics, user_display: str = None) -> Optional[bytes]:
@@ -214,9 +228,7 @@ async def generate_active_chart(stats: ActiveStatistics, user_display: str = Non
     
     loop = asyncio.get_running_loop()
     pfunc = partial(_generate_active_chart, stats, user_display)
-    
-    with concurrent.futures.ThreadPoolExecutor() as pool:
-        return await loop.run_in_executor(pool, pfunc)
+    return await loop.run_in_executor(_get_executor(), pfunc)
 
 
 def _generate_combined_chart(chat_stats: ChatStatistics, active_stats: ActiveStatistics, user_display: str = None) -> Optional[bytes]:
@@ -230,69 +242,47 @@ def _generate_combined_chart(chat_stats: ChatStatistics, active_stats: ActiveSta
     
     # Prepare data
     hours = list(range(24))
-    chat_counts = [chat_stats.hourly_distribution.get(h, 0) for h in hours]
-    active_counts = [active_stats.get_hourly_active_counts().get(h, 0) for h in hours]
+    chat_counts = np.asarray(chat_stats.hourly_distribution, dtype=np.int64)
+    active_counts = np.asarray(active_stats.get_hourly_active_counts(), dtype=np.int64)
+    total_active_hours = int(np.count_nonzero(active_counts))
+    user_part = f"{user_display}的" if user_display else ""
+    title = f'{user_part}过去{chat_stats.days}天统计概览'
+    chat_subtitle = '总消息: %d条' % chat_stats.total_messages
+    active_subtitle = '活跃小时: %d个' % total_active_hours
     
     # Create figure with flat design
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 8))
+    fig = Figure(figsize=(14, 8))
+    FigureCanvasAgg(fig)
+    ax1, ax2 = fig.subplots(2, 1)
     fig.patch.set_facecolor('#FAFAFA')  # Light gray background
     
-    # Create gradient colors for both charts based on hour (12pm brightest, 0am/24pm darkest)
-    import math
-    
-    chat_colors = []
-    active_colors = []
     text_color = '#2C3E50'      # Dark blue-gray
     
-    for hour in hours:
-        # Create brightness factor: 12pm = 1.0 (brightest), 0am/24pm = 0.3 (darkest)
-        brightness = 0.3 + 0.7 * (1 + math.cos(2 * math.pi * (hour - 12) / 24)) / 2
-        
-        # Chat colors - base blue #3498DB
-        base_r, base_g, base_b = 0x34/255, 0x98/255, 0xDB/255
-        light_r, light_g, light_b = 0.7, 0.9, 1.0  # Light blue-white
-        
-        r = base_r + (light_r - base_r) * (brightness - 0.3) / 0.7
-        g = base_g + (light_g - base_g) * (brightness - 0.3) / 0.7  
-        b = base_b + (light_b - base_b) * (brightness - 0.3) / 0.7
-        chat_colors.append((r, g, b))
-        
-        # Active colors - base red #E74C3C  
-        base_r, base_g, base_b = 0xE7/255, 0x4C/255, 0x3C/255
-        light_r, light_g, light_b = 1.0, 0.8, 0.8  # Light red-white
-        
-        r = base_r + (light_r - base_r) * (brightness - 0.3) / 0.7
-        g = base_g + (light_g - base_g) * (brightness - 0.3) / 0.7  
-        b = base_b + (light_b - base_b) * (brightness - 0.3) / 0.7
-        active_colors.append((r, g, b))
-    
     # Top chart - Chat messages with gradient
-    bars1 = ax1.bar(hours, chat_counts, color=chat_colors, alpha=0.9, width=0.8)
+    ax1.bar(hours, chat_counts, color=_COMBINED_CHAT_COLORS, alpha=0.9, width=0.8)
     
-    user_part = f"{user_display}的" if user_display else ""
-    ax1.set_title(f'{user_part}过去{chat_stats.days}天统计概览', 
-                  fontsize=18, fontweight='500', color=text_color, pad=15)
+    ax1.set_title(title, fontsize=18, fontweight='500', color=text_color, pad=15)
     ax1.set_ylabel('消息数量', fontsize=12, color=text_color)
     
     # Add total message count as subtitle
-    ax1.text(0.02, 0.95, f'总消息: {chat_stats.total_messages}条', 
+    ax1.text(0.02, 0.95, chat_subtitle,
              transform=ax1.transAxes, fontsize=11, color='#7F8C8D',
              verticalalignment='top')
     
     # Bottom chart - Active days with gradient
-    bars2 = ax2.bar(hours, active_counts, color=active_colors, alpha=0.9, width=0.8)
+    ax2.bar(hours, active_counts, color=_COMBINED_ACTIVE_COLORS, alpha=0.9, width=0.8)
     ax2.set_ylabel('活跃天数', fontsize=12, color=text_color)
     ax2.set_xlabel('小时', fontsize=12, color=text_color)
     
     # Add total active hours as subtitle
-    total_active_hours = len([h for h, count in active_stats.get_hourly_active_counts().items() if count > 0])
-    ax2.text(0.02, 0.95, f'活跃小时: {total_active_hours}个', 
+    ax2.text(0.02, 0.95, active_subtitle,
              transform=ax2.transAxes, fontsize=11, color='#7F8C8D',
              verticalalignment='top')
     
     # Style both charts with flat design
-    for ax, bars, max_val in [(ax1, bars1, max(chat_counts) if chat_counts else 1), 
-                              (ax2, bars2, max(active_counts) if active_counts else 1)]:
+    for ax, counts in [(ax1, chat_counts), (ax2, active_counts)]:
+        max_val = counts.max()
+
         # Remove spines for flat look
         ax.spines['top'].set_visible(False)
         ax.spines['right'].set_visible(False)
@@ -308,24 +298,21 @@ def _generate_combined_chart(chat_stats: ChatStatistics, active_stats: ActiveSta
         ax.set_xticklabels([f'{h:02d}' for h in hours[::2]], fontsize=10, color=text_color)
         ax.tick_params(colors=text_color, length=0)  # Remove tick marks
         
-        # Add value labels only on significant bars
-        for bar, count in zip(bars, chat_counts if ax == ax1 else active_counts):
-            if count > max_val * 0.1:  # Only show if > 10% of max
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height + max_val * 0.02,
-                       f'{int(count)}', ha='center', va='bottom', 
-                       fontsize=9, color=text_color, fontweight='400')
+        # Add value labels only on significant bars (> 10% of max)
+        label_offset = max_val * 0.02
+        for hour in np.flatnonzero(counts > max_val * 0.1).tolist():
+            count = int(counts[hour])
+            ax.text(hour, count + label_offset, f'{count}', ha='center', va='bottom',
+                    fontsize=9, color=text_color, fontweight='400')
     
     # Tight layout with minimal padding
-    plt.tight_layout(pad=2.0)
+    fig.tight_layout(pad=2.0)
     
     # Save with flat design optimization
     img_buffer = BytesIO()
-    plt.savefig(img_buffer, format='PNG', dpi=150, bbox_inches='tight', 
-                facecolor='#FAFAFA', edgecolor='none')
-    plt.close(fig)
-    
-    img_buffer.seek(0)
+    fig.savefig(img_buffer, format='PNG', dpi=_CHART_DPI, bbox_inches='tight',
+                facecolor='#FAFAFA', edgecolor='none', pil_kwargs=_PNG_OPTIONS)
+    # getvalue() hands back the buffer's own bytes object without another copy
     return img_buffer.getvalue()
 
 
@@ -336,7 +323,5 @@ async def generate_combined_chart(chat_stats: ChatStatistics, active_stats: Acti
     
     loop = asyncio.get_running_loop()
     pfunc = partial(_generate_combined_chart, chat_stats, active_stats, user_display)
-    
-    with concurrent.futures.ThreadPoolExecutor() as pool:
-        return await loop.run_in_executor(pool, pfunc)
+    return await loop.run_in_executor(_get_executor(), pfunc)
 
@@ -1,9 +1,14 @@
+import asyncio
 import datetime
 import logging
+from collections import OrderedDict
+from typing import Optional
 
-from nonebot import on_command, on_message, permission
-from nonebot.rule import is_type, to_me
-from nonebot.adapters.onebot.v11 import GroupMessageEvent, MessageEvent
+from nonebot import get_driver, on_command, on_message, permission
+from nonebot.rule import Rule, to_me
+from nonebot.adapters import Event
+from nonebot.adapters.onebot.v11 import GroupMessageEvent, Message, MessageEvent
+from nonebot.typing import T_State
 
 from nonebot import CommandGroup
 from sqlalchemy import select
@@ -14,8 +19,37 @@ from .__init__ import config
 
 
 citation_db = config.citation_counter_db_path
+_IGNORED_USER_IDS = frozenset(config.citation_counter_ignore_user_ids)
 
-command_rule = is_type(GroupMessageEvent) & to_me()
+# One connection for the whole process; handlers take the lock around each use
+_CONN: Optional[sqlite3.Connection] = None
+_CONN_LOCK = asyncio.Lock()
+
+
+async def _get_conn() -> sqlite3.Connection:
+    global _CONN
+    if _CONN is None:
+        citation_db.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(citation_db.resolve(), check_same_thread=False)
+        await init_db(conn)
+        _CONN = conn
+    return _CONN
+
+
+@get_driver().on_shutdown
+async def _close_conn() -> None:
+    global _CONN
+    async with _CONN_LOCK:
+        if _CONN is not None:
+            _CONN.close()
+            _CONN = None
+
+
+# async so nonebot does not hand these cheap checks off to a worker thread
+async def _group_at_me(event: Event) -> bool:
+    return isinstance(event, GroupMessageEvent) and event.is_tome()
+
+command_rule = Rule(_group_at_me)
 cite_cmd_group = CommandGroup("cite", rule=command_rule, priority=10, block=True)
 
 cmd = cite_cmd_group.command(tuple())
@@ -23,29 +57,38 @@ today_cmd = cite_cmd_group.command("today")
 yesterday_cmd = cite_cmd_group.command("yesterday")
 total_cmd = cite_cmd_group.command("total")
 
+async def get_user_names(user_ids) -> dict:
+    user_ids = list(user_ids)
+    async with get_session() as db_session:
+        statement = select(UserModel.user_id, UserModel.user_data).where(
+            UserModel.user_id.in_([str(user_id) for user_id in user_ids])
+        )
+        result = await db_session.execute(statement)
+        user_data_by_id = {user_id: user_data for user_id, user_data in result.all()}
+
+    user_names = {}
+    for user_id in user_ids:
+        user_data = user_data_by_id.get(str(user_id))
+        if user_data:
+            user_names[user_id] = user_data.get("name", user_id)
+        else:
+            user_names[user_id] = user_id
+    return user_names
+
 async def handle_command(event: GroupMessageEvent, date: datetime.date, prompt: str, finish_cmd):
     group_id = event.group_id
     try:
-        citation_db.parent.mkdir(parents=True, exist_ok=True)
-        with sqlite3.connect(citation_db.resolve()) as conn:
-            await init_db(conn)
-            if date is None:
-                d = await get_all_data(conn, group_id)
-            else:
-                d = await get_data_by_date(conn, group_id, date)
+        async with _CONN_LOCK:
+            conn = await _get_conn()
+            with conn:
+                if date is None:
+                    d = await get_all_data(conn, group_id)
+                else:
+                    d = await get_data_by_date(conn, group_id, date)
         if not d:
             await finish_cmd.finish(f"{prompt}无数据")
         else:
-            user_names = {}
-            async with get_session() as db_session:
-                for user_id in d.keys():
-                    statement = select(UserModel.user_data).where(UserModel.user_id == user_id)
-                    result = await db_session.execute(statement)
-                    user_data = result.scalar_one_or_none()
-                    if user_data:
-                        user_names[user_id] = user_data.get("name", user_id)
-                    else:
-                        user_names[user_id] = user_id
+            user_names = await get_user_names(d.keys())
             await finish_cmd.finish(f"{prompt}引用数：\n" + "\n".join([f"{user_names[k]}: {v}" for k, v in d.items()]))
     except sqlite3.Error as e:
         logging.error(f"An error occurred: {e}")
@@ -69,7 +112,15 @@ test = on_command("test", rule=to_me(), permission=permission.SUPERUSER)
 async def _(event: MessageEvent):
     await test.finish("t")
 
-def is_reply(event: GroupMessageEvent) -> bool:
+def _extract_reply_id(message: Message) -> Optional[str]:
+    # only the first reply segment counts; an id of 0 means no real target
+    for seg in message:
+        if seg.type == 'reply':
+            reply_id = seg.data.get('id')
+            return reply_id if reply_id and int(reply_id) != 0 else None
+    return None
+
+async def is_reply(event: Event, state: T_State) -> bool:
     # debug
     # print("===>")
     # print(event.message_id)
@@ -78,43 +129,52 @@ def is_reply(event: GroupMessageEvent) -> bool:
     # print(event.original_message)
     # print("<===")
 
-    for seg in event.original_message:
-        # print(seg.type, seg.data)
-        if seg.type == 'reply':
-            if int(seg.data['id']) != 0:
-                return True
-            else:
-                return False
-    return False
+    if not isinstance(event, GroupMessageEvent) or str(event.user_id) in _IGNORED_USER_IDS:
+        return False
+
+    reply_message_id = _extract_reply_id(event.original_message)
+    if reply_message_id is None:
+        return False
+    # hand the id to the handler so it does not scan the message again
+    state["reply_message_id"] = reply_message_id
+    return True
+
+
+# Replies mostly target recent messages, so keep a small LRU of sender lookups
+_MESSAGE_SENDER_CACHE: "OrderedDict[str, str]" = OrderedDict()
+_MESSAGE_SENDER_CACHE_MAX = 4096
 
 
 async def get_user_id_from_message_id(message_id: str) -> str:
+    user_id = _MESSAGE_SENDER_CACHE.get(message_id)
+    if user_id is not None:
+        _MESSAGE_SENDER_CACHE.move_to_end(message_id)
+        return user_id
+
     async with get_session() as db_session:
         statement = (
             select(UserModel.user_id)
             .where(MessageRecord.message_id == message_id)
             .join(SessionModel, UserModel.id == SessionModel.user_persist_id)
             .join(MessageRecord, SessionModel.id == MessageRecord.session_persist_id)
+            .order_by(MessageRecord.id.desc())
+            .limit(1)
         )
         result = await db_session.execute(statement)
-        user_ids = result.scalars().all()
-        user_id = user_ids[-1] if user_ids else None
+        user_id = result.scalar()
+
+    if user_id is not None:
+        _MESSAGE_SENDER_CACHE[message_id] = user_id
+        if len(_MESSAGE_SENDER_CACHE) > _MESSAGE_SENDER_CACHE_MAX:
+            _MESSAGE_SENDER_CACHE.popitem(last=False)
     return user_id
 
 reply = on_message(rule=is_reply, block=False)
 
 @reply.handle()
-async def _(event: GroupMessageEvent):
+async def _(event: GroupMessageEvent, state: T_State):
     group_id = event.group_id
-
-    for seg in event.original_message:
-        # print(seg)
-        if seg.type == 'reply':
-            reply_message_id: str = seg.data['id']
-
-    if reply_message_id is None:
-        logging.warning(f"can't find reply message id in {event.original_message}")
-        return
+    reply_message_id: str = state["reply_message_id"]
 
     replied_user_id = await get_user_id_from_message_id(reply_message_id)
 
@@ -122,17 +182,11 @@ async def _(event: GroupMessageEvent):
         logging.warning(f"can't find replied user id in {reply_message_id}")
         return
 
-    if str(event.user_id) in config.citation_counter_ignore_user_ids:
-        return
-
     try:
-        citation_db.parent.mkdir(parents=True, exist_ok=True)
-        with sqlite3.connect(citation_db.resolve()) as conn:
-            await init_db(conn)
-            await add_date(conn, group_id, datetime.date.today())
-            await add_user(conn, group_id, replied_user_id)
-
-            await iterate_number(conn, group_id, datetime.date.today(), replied_user_id)
+        async with _CONN_LOCK:
+            conn = await _get_conn()
+            with conn:
+                await iterate_number(conn, group_id, datetime.date.today(), replied_user_id)
 
     except sqlite3.Error as e:
         logging.error(f"An error occurred: {e}")
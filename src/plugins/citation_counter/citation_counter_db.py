@@ -12,6 +12,17 @@ create_group_table_template = '''CREATE TABLE IF NOT EXISTS group_{group_id} (
     date DATE NOT NULL
     );'''
 
+create_group_date_index_template = '''CREATE INDEX IF NOT EXISTS idx_group_{group_id}_date
+    ON group_{group_id} (date);'''
+
+connection_pragmas = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "mmap_size=67108864",
+    "cache_size=-4096",
+)
+
 
 class fstr:
     def __init__(self, payload):
@@ -24,7 +35,12 @@ class fstr:
 # --- DB WRITE ---
 async def init_db(conn):
     cursor = conn.cursor()
+    for pragma in connection_pragmas:
+        cursor.execute("PRAGMA " + pragma)
     cursor.execute(create_index_table)
+    # tables created before the date index existed
+    for (group_id,) in cursor.execute("SELECT group_id FROM groups").fetchall():
+        cursor.execute(str(fstr(create_group_date_index_template)))
     conn.commit()
 
 async def add_group(conn, group_id):
@@ -32,6 +48,7 @@ async def add_group(conn, group_id):
     cursor.execute("SELECT 1 FROM groups WHERE group_id = ?", (group_id,))
     if cursor.fetchone() is None:
         cursor.execute(str(fstr(create_group_table_template)))
+        cursor.execute(str(fstr(create_group_date_index_template)))
         cursor.execute(str(fstr("INSERT INTO groups (group_id) VALUES (?)")), (group_id,))
         conn.commit()
     # else:
@@ -70,11 +87,14 @@ async def add_user(conn, group_id, user_id):
     #     print(f"Column {column_name} already exists in group_{group_id}.")
 
 async def iterate_number(conn, group_id, date, user_id):
-    await add_date(conn, group_id, date)
     await add_user(conn, group_id, user_id)
 
+    # bump the existing date row, or create it with this user's first citation
+    # (other user columns pick up their DEFAULT 0)
     cursor = conn.cursor()
     cursor.execute(str(fstr("UPDATE group_{group_id} SET user_{user_id} = user_{user_id} + 1 WHERE date = ?")), (date,))
+    if cursor.rowcount == 0:
+        cursor.execute(str(fstr("INSERT INTO group_{group_id} (date, user_{user_id}) VALUES (?, 1)")), (date,))
     conn.commit()
 
 # --- DB READ ---
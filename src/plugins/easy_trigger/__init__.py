@@ -29,6 +29,8 @@ _ICE_TEA_NEKO_IMAGE_PATH = Path(__file__).resolve().parent / "assets" / "IceTeaN
 
 plugin_config = get_plugin_config(Config)
 
+_BOT_SELF_IDS: dict[str, int] = {}
+
 
 def _contains(values: dict[str, set[str]], trigger_name: str, value: object) -> bool:
     return str(value) in values.get(trigger_name, set())
@@ -53,6 +55,13 @@ def _is_trigger_allowed(trigger_name: str, event: object) -> bool:
     return True
 
 
+def _bot_self_id(bot: Bot) -> int:
+    self_id = _BOT_SELF_IDS.get(bot.self_id)
+    if self_id is None:
+        self_id = _BOT_SELF_IDS[bot.self_id] = int(bot.self_id)
+    return self_id
+
+
 def _should_handle_mute_notice(event: GroupBanNoticeEvent) -> bool:
     return _is_trigger_allowed(TRIGGER_MUTE_NOTICE, event)
 
@@ -109,12 +118,12 @@ ice_tea_neko_handler = on_message(
 
 @mute_handler.handle()
 async def handle_mute(event: GroupBanNoticeEvent, bot: Bot):
-    self_id = int(bot.self_id)
-
-    if (event.duration > 0) and (event.user_id != self_id):
-        await mute_handler.finish(at_sender=event.user_id, message=MUTE_REPLY)
+    is_self = event.user_id == _bot_self_id(bot)
 
-    if (event.duration == 0) and (event.user_id == self_id):
+    if event.duration > 0:
+        if not is_self:
+            await mute_handler.finish(at_sender=event.user_id, message=MUTE_REPLY)
+    elif event.duration == 0 and is_self:
         await mute_handler.finish(message=SELF_UNMUTED_REPLY)
 
 
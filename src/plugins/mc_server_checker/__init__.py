@@ -3,6 +3,7 @@ from __future__ import annotations
 import asyncio
 import re
 import time
+from collections import defaultdict
 from dataclasses import dataclass, field
 from typing import Any, cast
 
@@ -24,13 +25,17 @@ from nonebot.params import CommandArg
 from .config import Config
 from .storage import (
     add_server,
+    flush_state,
+    flush_state_async,
     get_group_servers,
     get_preset_state,
     get_server_state,
     load_presets,
     load_state,
+    mark_state_dirty,
+    preload_state,
     remove_server,
-    save_state,
+    schedule_flush,
 )
 
 require("nonebot_plugin_localstore")
@@ -55,14 +60,27 @@ _PLAYER_DEBOUNCE_SECONDS = max(
 )
 _OFFLINE_FAILURE_THRESHOLD = 5
 _ONLINE_SUCCESS_THRESHOLD = 5
+_STATE_FLUSH_INTERVAL_SECONDS = 60
+_JAVA_SERVER_TTL_SECONDS = 600
+_ADMINS = frozenset(int(admin) for admin in plugin_config.mc_server_checker_admins)
 
-_STATE_LOCK = asyncio.Lock()
+# The cached state is only read and mutated between awaits, so it needs
+# no lock of its own; _POLL_LOCK just keeps scheduled polls from overlapping.
 _POLL_LOCK = asyncio.Lock()
+# Caps simultaneous status probes so large fan-outs don't exhaust sockets.
+_PROBE_SEMAPHORE = asyncio.Semaphore(
+    max(1, int(plugin_config.mc_server_checker_max_concurrency))
+)
+
+# Reverse index of watched servers per group, kept in step with the cached
+# state so polls need not rescan it. Inner dicts act as insertion-ordered sets.
+_ALL_SERVERS: dict[int, dict[str, None]] = {}
+_ONLINE_SERVERS: dict[int, dict[str, None]] = {}
+_INDEXED_STATE: dict[str, Any] | None = None
 
-_PLAYER_ONLINE_PLAYERS: dict[tuple[int, str], dict[str, float]] = {}
-_PLAYER_LAST_OFFLINE_AT: dict[tuple[int, str], dict[str, float]] = {}
-_PLAYER_PENDING_JOINS: dict[tuple[int, str], dict[str, float]] = {}
-_PLAYER_PENDING_LEAVES: dict[tuple[int, str], dict[str, float]] = {}
+# Resolved servers (SRV lookup included) per address, with the time they were
+# resolved. Entries are dropped whenever a probe through them fails.
+_JAVA_SERVER_CACHE: dict[str, tuple[JavaServer, float]] = {}
 
 _QUERY_TRIGGERS = frozenset(
     {
@@ -71,8 +89,10 @@ _QUERY_TRIGGERS = frozenset(
     }
 )
 
-_HEX_FORMATTING_RE = re.compile("\u00a7x(?:\u00a7[0-9A-Fa-f]){6}")
-_FORMATTING_CODE_RE = re.compile("\u00a7[0-9A-FK-ORa-fk-or]")
+# Hex colour runs first, then single formatting codes, then any stray section sign.
+_FORMATTING_RE = re.compile(
+    "\u00a7x(?:\u00a7[0-9A-Fa-f]){6}|\u00a7[0-9A-FK-ORa-fk-or]|\u00a7"
+)
 
 
 @dataclass
@@ -86,6 +106,32 @@ class ServerCheckResult:
     player_sample: list[str] = field(default_factory=list)
     ping_ms: int | None = None
     error: str | None = None
+    # Normalised sample names, computed once per probe for the presence diff.
+    player_names: frozenset[str] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.player_names = frozenset(
+            normalized_name
+            for name in self.player_sample
+            if (normalized_name := _normalize_player_name(name)) is not None
+        )
+
+
+@dataclass(slots=True)
+class PlayerPresence:
+    """Player tracking for one watched server in one group.
+
+    ``online`` is None until the first sample after the server (re)appears;
+    that sample becomes the baseline and produces no join messages.
+    """
+
+    online: dict[str, float] | None = None
+    last_offline: dict[str, float] = field(default_factory=dict)
+    pending_joins: dict[str, float] = field(default_factory=dict)
+    pending_leaves: dict[str, float] = field(default_factory=dict)
+
+
+_PRESENCE: defaultdict[int, dict[str, PlayerPresence]] = defaultdict(dict)
 
 
 @dataclass(frozen=True)
@@ -139,29 +185,40 @@ def _resolve_query_preset(text: str) -> QueryPreset | None:
     return None
 
 
+def _event_text(event: GroupMessageEvent) -> str:
+    # Most group traffic is a lone text segment or a lone non-text one (image,
+    # sticker, ...); answer both without assembling the full plaintext.
+    message = event.message
+    if len(message) == 1:
+        segment = message[0]
+        return segment.data.get("text", "").strip() if segment.type == "text" else ""
+    return event.get_plaintext().strip()
+
+
 def _match_query_trigger(event: GroupMessageEvent) -> bool:
-    text = event.get_plaintext().strip()
+    text = _event_text(event)
     if not text:
         return False
     return text in _QUERY_TRIGGERS or _resolve_query_preset(text) is not None
 
 
 def _is_admin(user_id: int) -> bool:
-    return int(user_id) in set(plugin_config.mc_server_checker_admins)
+    return int(user_id) in _ADMINS
 
 
 def _compact_text(text: Any) -> str:
     if text is None:
         return ""
-    return " ".join(str(text).replace("\r", " ").replace("\n", " ").split())
+    # str.split() already breaks on \r, \n and every other whitespace run.
+    return " ".join(str(text).split())
 
 
 def _strip_minecraft_formatting(text: str) -> str:
     if not text:
         return ""
-    without_hex = _HEX_FORMATTING_RE.sub("", text)
-    without_codes = _FORMATTING_CODE_RE.sub("", without_hex)
-    return without_codes.replace("\u00a7", "")
+    if "\u00a7" not in text:
+        return text
+    return _FORMATTING_RE.sub("", text)
 
 
 def _format_motd(description: Any) -> str:
@@ -284,7 +341,7 @@ def _format_change_message(
 
 
 def _queue_broadcast_messages(
-    broadcast_messages: dict[int, list[str]],
+    broadcast_messages: defaultdict[int, list[str]],
     group_ids: tuple[int, ...],
     message: str,
     *,
@@ -293,30 +350,31 @@ def _queue_broadcast_messages(
     for group_id in group_ids:
         if exclude_group_id is not None and group_id == exclude_group_id:
             continue
-        broadcast_messages.setdefault(group_id, []).append(message)
+        broadcast_messages[group_id].append(message)
 
 
-def _presence_key(group_id: int, ip: str) -> tuple[int, str]:
-    return (group_id, ip)
+def _presence_now() -> float:
+    # Presence timestamps never leave the process, so they use the monotonic
+    # clock; persisted server timestamps stay on wall-clock time.
+    return time.monotonic()
 
 
 def _clear_player_presence(group_id: int, ip: str) -> None:
-    key = _presence_key(group_id, ip)
-    _PLAYER_ONLINE_PLAYERS.pop(key, None)
-    _PLAYER_LAST_OFFLINE_AT.pop(key, None)
-    _PLAYER_PENDING_JOINS.pop(key, None)
-    _PLAYER_PENDING_LEAVES.pop(key, None)
+    _PRESENCE[group_id].pop(ip, None)
 
 
 def _mark_all_players_offline(group_id: int, ip: str, now: float) -> None:
-    key = _presence_key(group_id, ip)
-    previous = _PLAYER_ONLINE_PLAYERS.pop(key, None)
-    _PLAYER_PENDING_JOINS.pop(key, None)
-    _PLAYER_PENDING_LEAVES.pop(key, None)
+    presence = _PRESENCE[group_id].get(ip)
+    if presence is None:
+        return
+    previous = presence.online
+    presence.online = None
+    presence.pending_joins.clear()
+    presence.pending_leaves.clear()
     if not previous:
         return
-    offline_map = _PLAYER_LAST_OFFLINE_AT.setdefault(key, {})
-    for player_name in previous.keys():
+    offline_map = presence.last_offline
+    for player_name in previous:
         offline_map[player_name] = now
 
 
@@ -331,105 +389,110 @@ def _build_player_diff_messages(
         _mark_all_players_offline(group_id, result.ip, now)
         return []
 
-    key = _presence_key(group_id, result.ip)
     server_label = display_name or result.ip
-    sample_players = {
-        normalized_name
-        for name in result.player_sample
-        if (normalized_name := _normalize_player_name(name)) is not None
-    }
-
-    if key not in _PLAYER_ONLINE_PLAYERS:
-        _PLAYER_ONLINE_PLAYERS[key] = {name: now for name in sample_players}
-        _PLAYER_LAST_OFFLINE_AT.setdefault(key, {})
-        _PLAYER_PENDING_JOINS.pop(key, None)
-        _PLAYER_PENDING_LEAVES.pop(key, None)
+    sample_players = result.player_names
+
+    group_presence = _PRESENCE[group_id]
+    presence = group_presence.get(result.ip)
+    if presence is None:
+        presence = group_presence[result.ip] = PlayerPresence()
+    if presence.online is None:
+        presence.online = {name: now for name in sample_players}
+        presence.pending_joins.clear()
+        presence.pending_leaves.clear()
         return []
 
-    previous_online = _PLAYER_ONLINE_PLAYERS.get(key, {})
-    offline_map = _PLAYER_LAST_OFFLINE_AT.setdefault(key, {})
-    pending_joins = _PLAYER_PENDING_JOINS.setdefault(key, {})
-    pending_leaves = _PLAYER_PENDING_LEAVES.setdefault(key, {})
+    online = presence.online
+    offline_map = presence.last_offline
+    pending_joins = presence.pending_joins
+    pending_leaves = presence.pending_leaves
     messages: list[str] = []
-    next_online: dict[str, float] = {}
 
-    for player_name in sorted(sample_players):
-        pending_leaves.pop(player_name, None)
-        if player_name in previous_online:
-            next_online[player_name] = previous_online[player_name]
-            pending_joins.pop(player_name, None)
-            continue
+    joined = sample_players - online.keys()
+    left = online.keys() - sample_players
+    for player_name in sample_players & pending_leaves.keys():
+        del pending_leaves[player_name]
+    for player_name in (sample_players & pending_joins.keys()) - joined:
+        del pending_joins[player_name]
 
+    for player_name in sorted(joined):
         pending_since = pending_joins.setdefault(player_name, now)
         if now - pending_since < _PLAYER_DEBOUNCE_SECONDS:
             continue
 
-        next_online[player_name] = pending_since
-        pending_joins.pop(player_name, None)
+        online[player_name] = pending_since
+        del pending_joins[player_name]
         offline_at = offline_map.get(player_name)
         offline_for = (
-            _format_duration(pending_since - float(offline_at))
+            _format_duration(pending_since - offline_at)
             if offline_at is not None
             else "unknown"
         )
         messages.append(f"[+] {player_name} {server_label} | offline for: {offline_for}")
 
-    full_sample = len(sample_players) == result.players_online
-    for player_name, online_since in previous_online.items():
-        if player_name in sample_players:
-            continue
-        if not full_sample:
-            next_online[player_name] = online_since
-            continue
+    if len(sample_players) != result.players_online:
+        # A truncated sample can't tell who left; keep everyone online.
+        return messages
 
+    for player_name in sorted(left):
         pending_since = pending_leaves.setdefault(player_name, now)
         if now - pending_since < _PLAYER_DEBOUNCE_SECONDS:
-            next_online[player_name] = online_since
             continue
 
-        online_for = _format_duration(pending_since - float(online_since))
+        online_since = online.pop(player_name)
+        online_for = _format_duration(pending_since - online_since)
         messages.append(f"[-] {player_name} {server_label} | online for: {online_for}")
         offline_map[player_name] = pending_since
-        pending_leaves.pop(player_name, None)
-
-    _PLAYER_ONLINE_PLAYERS[key] = next_online
+        del pending_leaves[player_name]
     return messages
 
 
+async def _lookup_server(ip: str, timeout: int) -> JavaServer:
+    now = time.monotonic()
+    cached = _JAVA_SERVER_CACHE.get(ip)
+    if cached is not None and now - cached[1] < _JAVA_SERVER_TTL_SECONDS:
+        return cached[0]
+    server = await JavaServer.async_lookup(ip, timeout=timeout)
+    _JAVA_SERVER_CACHE[ip] = (server, now)
+    return server
+
+
 async def _check_server(ip: str) -> ServerCheckResult:
     timeout = max(1, int(plugin_config.mc_server_checker_timeout_seconds))
-    try:
-        server = await JavaServer.async_lookup(ip, timeout=timeout)
-        status = await asyncio.wait_for(server.async_status(), timeout=timeout)
-        version = getattr(status.version, "name", None) if status.version else None
-        motd = _format_motd(getattr(status, "description", None))
-        players_online = int(getattr(status.players, "online", 0) or 0)
-        players_max = int(getattr(status.players, "max", 0) or 0)
-        sample = []
-        if status.players and status.players.sample:
-            for player in status.players.sample:
-                name = getattr(player, "name", None)
-                if name:
-                    sample.append(str(name))
-        ping_ms = None
-        if hasattr(status, "latency") and status.latency is not None:
-            ping_ms = int(round(float(status.latency)))
-        return ServerCheckResult(
-            ip=ip,
-            online=True,
-            version=version,
-            motd=motd,
-            players_online=players_online,
-            players_max=players_max,
-            player_sample=sample,
-            ping_ms=ping_ms,
-        )
-    except Exception as exc:
-        return ServerCheckResult(
-            ip=ip,
-            online=False,
-            error=f"{type(exc).__name__}: {exc}",
-        )
+    async with _PROBE_SEMAPHORE:
+        try:
+            server = await _lookup_server(ip, timeout)
+            status = await asyncio.wait_for(server.async_status(), timeout=timeout)
+            version = getattr(status.version, "name", None) if status.version else None
+            motd = _format_motd(getattr(status, "description", None))
+            players_online = int(getattr(status.players, "online", 0) or 0)
+            players_max = int(getattr(status.players, "max", 0) or 0)
+            sample = []
+            if status.players and status.players.sample:
+                for player in status.players.sample:
+                    name = getattr(player, "name", None)
+                    if name:
+                        sample.append(str(name))
+            ping_ms = None
+            if hasattr(status, "latency") and status.latency is not None:
+                ping_ms = int(round(float(status.latency)))
+            return ServerCheckResult(
+                ip=ip,
+                online=True,
+                version=version,
+                motd=motd,
+                players_online=players_online,
+                players_max=players_max,
+                player_sample=sample,
+                ping_ms=ping_ms,
+            )
+        except Exception as exc:
+            _JAVA_SERVER_CACHE.pop(ip, None)
+            return ServerCheckResult(
+                ip=ip,
+                online=False,
+                error=f"{type(exc).__name__}: {exc}",
+            )
 
 
 def _apply_status_update(
@@ -500,10 +563,12 @@ def _apply_status_update(
                 now,
                 display_name=display_name,
             )
-            _mark_all_players_offline(group_id, result.ip, float(pending_offline_since))
+            offline_for = now - float(pending_offline_since)
+            _mark_all_players_offline(group_id, result.ip, _presence_now() - offline_for)
             server_state["pending_offline_since"] = None
         server_state["last_status"] = "offline"
     server_state["last_check_at"] = now
+    _sync_online_index(group_id, result.ip, server_state)
     return change_message
 
 
@@ -525,35 +590,64 @@ async def _send_group_message(group_id: int, message: str) -> None:
         logger.warning(f"Failed to send group message: {exc}")
 
 
-def _collect_group_servers(
-    state: dict[str, Any], only_online_servers: bool
-) -> dict[int, list[str]]:
-    groups = state.get("groups", {})
-    group_servers: dict[int, list[str]] = {}
-    for group_id_str, group_data in groups.items():
+def _rebuild_server_index(state: dict[str, Any]) -> None:
+    global _INDEXED_STATE
+    _ALL_SERVERS.clear()
+    _ONLINE_SERVERS.clear()
+    for group_id, group_data in state.get("groups", {}).items():
         if not isinstance(group_data, dict):
             continue
         servers = group_data.get("servers", {})
         if not isinstance(servers, dict):
             continue
-        try:
-            group_id = int(group_id_str)
-        except ValueError:
-            continue
 
-        ips: list[str] = []
         for ip, server_state in servers.items():
             if not isinstance(ip, str):
                 continue
-            if not only_online_servers:
-                ips.append(ip)
-                continue
+            _ALL_SERVERS.setdefault(group_id, {})[ip] = None
             if isinstance(server_state, dict) and server_state.get("last_status") == "online":
-                ips.append(ip)
+                _ONLINE_SERVERS.setdefault(group_id, {})[ip] = None
+    _INDEXED_STATE = state
+
 
-        if ips:
-            group_servers[group_id] = ips
-    return group_servers
+def _ensure_server_index(state: dict[str, Any]) -> None:
+    if _INDEXED_STATE is not state:
+        _rebuild_server_index(state)
+
+
+def _index_add_server(group_id: int, ip: str) -> None:
+    _ALL_SERVERS.setdefault(group_id, {})[ip] = None
+
+
+def _index_remove_server(group_id: int, ip: str) -> None:
+    for index in (_ALL_SERVERS, _ONLINE_SERVERS):
+        servers = index.get(group_id)
+        if servers is None:
+            continue
+        servers.pop(ip, None)
+        if not servers:
+            del index[group_id]
+
+
+def _sync_online_index(group_id: int, ip: str, server_state: dict[str, Any]) -> None:
+    if ip not in _ALL_SERVERS.get(group_id, ()):
+        return
+    if server_state.get("last_status") == "online":
+        _ONLINE_SERVERS.setdefault(group_id, {})[ip] = None
+        return
+    online = _ONLINE_SERVERS.get(group_id)
+    if online is not None:
+        online.pop(ip, None)
+        if not online:
+            del _ONLINE_SERVERS[group_id]
+
+
+def _collect_group_servers(
+    state: dict[str, Any], only_online_servers: bool
+) -> dict[int, list[str]]:
+    _ensure_server_index(state)
+    index = _ONLINE_SERVERS if only_online_servers else _ALL_SERVERS
+    return {group_id: list(ips) for group_id, ips in index.items()}
 
 
 async def _run_check(
@@ -563,9 +657,8 @@ async def _run_check(
 ) -> None:
     async with _POLL_LOCK:
         broadcast_presets = _get_preset_broadcasts() if send_changes else []
-        async with _STATE_LOCK:
-            state = load_state()
-            group_servers = _collect_group_servers(state, only_online_servers)
+        state = load_state()
+        group_servers = _collect_group_servers(state, only_online_servers)
 
         if not group_servers and not broadcast_presets:
             return
@@ -575,91 +668,110 @@ async def _run_check(
             for ip in ips:
                 local_group_ids_by_ip.setdefault(ip, set()).add(group_id)
 
-        results_by_group: dict[int, list[ServerCheckResult]] = {}
-        for group_id, servers in group_servers.items():
-            tasks = [_check_server(ip) for ip in servers]
-            results_by_group[group_id] = await asyncio.gather(*tasks)
-        preset_results: list[tuple[QueryPreset, ServerCheckResult]] = []
-        for preset in broadcast_presets:
-            preset_results.append((preset, await _check_server(preset.target_ip)))
+        # Probe every distinct address once, all concurrently, then fan the
+        # results back out to each group / preset that watches it.
+        unique_ips = list(
+            dict.fromkeys(
+                [ip for ips in group_servers.values() for ip in ips]
+                + [preset.target_ip for preset in broadcast_presets]
+            )
+        )
+        checked = await asyncio.gather(*[_check_server(ip) for ip in unique_ips])
+        results_by_ip = dict(zip(unique_ips, checked))
+
+        results_by_group: dict[int, list[ServerCheckResult]] = {
+            group_id: [results_by_ip[ip] for ip in ips]
+            for group_id, ips in group_servers.items()
+        }
+        preset_results: list[tuple[QueryPreset, ServerCheckResult]] = [
+            (preset, results_by_ip[preset.target_ip]) for preset in broadcast_presets
+        ]
 
         now = time.time()
-        change_messages: dict[int, list[str]] = {}
-
-        async with _STATE_LOCK:
-            state = load_state()
-            for group_id, results in results_by_group.items():
-                for result in results:
-                    server_state = get_server_state(state, group_id, result.ip)
-                    change_message = _apply_status_update(
-                        group_id, server_state, result, now
-                    )
-                    if change_message:
-                        change_messages.setdefault(group_id, []).append(change_message)
-                    if include_player_changes and result.online:
-                        player_messages = _build_player_diff_messages(group_id, result, now)
-                        if player_messages:
-                            change_messages.setdefault(group_id, []).extend(player_messages)
-            for preset, result in preset_results:
-                server_state = get_preset_state(state, preset.trigger)
-                broadcast_group_ids = tuple(
-                    group_id
-                    for group_id in preset.broadcast_group_ids
-                    if group_id not in local_group_ids_by_ip.get(result.ip, set())
-                )
-                change_message = _apply_status_update(
-                    0,
-                    server_state,
-                    result,
-                    now,
-                    display_name=preset.display_name,
-                )
-                if not result.online and server_state.get("last_status") == "offline":
-                    for group_id in broadcast_group_ids:
-                        _mark_all_players_offline(group_id, result.ip, now)
-                if not change_message:
-                    if include_player_changes and result.online:
-                        for group_id in broadcast_group_ids:
-                            player_messages = _build_player_diff_messages(
-                                group_id,
-                                result,
-                                now,
-                                display_name=preset.display_name,
-                            )
-                            if player_messages:
-                                change_messages.setdefault(group_id, []).extend(player_messages)
-                    continue
+        presence_now = _presence_now()
+        change_messages: defaultdict[int, list[str]] = defaultdict(list)
 
-                _queue_broadcast_messages(
-                    change_messages,
-                    broadcast_group_ids,
-                    change_message,
+        for group_id, results in results_by_group.items():
+            for result in results:
+                server_state = get_server_state(state, group_id, result.ip)
+                change_message = _apply_status_update(
+                    group_id, server_state, result, now
                 )
+                if change_message:
+                    change_messages[group_id].append(change_message)
+                if include_player_changes and result.online:
+                    player_messages = _build_player_diff_messages(
+                        group_id, result, presence_now
+                    )
+                    if player_messages:
+                        change_messages[group_id].extend(player_messages)
+        for preset, result in preset_results:
+            server_state = get_preset_state(state, preset.trigger)
+            broadcast_group_ids = tuple(
+                group_id
+                for group_id in preset.broadcast_group_ids
+                if group_id not in local_group_ids_by_ip.get(result.ip, set())
+            )
+            change_message = _apply_status_update(
+                0,
+                server_state,
+                result,
+                now,
+                display_name=preset.display_name,
+            )
+            if not result.online and server_state.get("last_status") == "offline":
+                for group_id in broadcast_group_ids:
+                    _mark_all_players_offline(group_id, result.ip, presence_now)
+            if not change_message:
                 if include_player_changes and result.online:
                     for group_id in broadcast_group_ids:
                         player_messages = _build_player_diff_messages(
                             group_id,
                             result,
-                            now,
+                            presence_now,
                             display_name=preset.display_name,
                         )
                         if player_messages:
-                            change_messages.setdefault(group_id, []).extend(player_messages)
-            save_state(state)
+                            change_messages[group_id].extend(player_messages)
+                continue
+
+            _queue_broadcast_messages(
+                change_messages,
+                broadcast_group_ids,
+                change_message,
+            )
+            if include_player_changes and result.online:
+                for group_id in broadcast_group_ids:
+                    player_messages = _build_player_diff_messages(
+                        group_id,
+                        result,
+                        presence_now,
+                        display_name=preset.display_name,
+                    )
+                    if player_messages:
+                        change_messages[group_id].extend(player_messages)
+        mark_state_dirty()
 
         if send_changes:
-            for group_id, messages in change_messages.items():
-                if messages:
-                    await _send_group_message(group_id, "\n".join(messages))
+            # One stalled group must not hold up the others.
+            await asyncio.gather(
+                *[
+                    _send_group_message(group_id, "\n".join(messages))
+                    for group_id, messages in change_messages.items()
+                ],
+                return_exceptions=True,
+            )
 
 
 _JOB_ID = "mc_server_checker_poll"
 _PLAYER_JOB_ID = "mc_server_checker_player_poll"
+_FLUSH_JOB_ID = "mc_server_checker_flush"
 driver = get_driver()
 
 
 @driver.on_startup
 async def _start_polling() -> None:
+    await preload_state()
     if scheduler.get_job(_JOB_ID):
         pass
     else:
@@ -677,6 +789,16 @@ async def _start_polling() -> None:
             },
         )
 
+    if not scheduler.get_job(_FLUSH_JOB_ID):
+        # Poll results only touch the in-memory state; persist them periodically.
+        scheduler.add_job(
+            flush_state_async,
+            "interval",
+            seconds=_STATE_FLUSH_INTERVAL_SECONDS,
+            id=_FLUSH_JOB_ID,
+            coalesce=True,
+        )
+
     if scheduler.get_job(_PLAYER_JOB_ID):
         return
     scheduler.add_job(
@@ -702,6 +824,10 @@ async def _stop_polling() -> None:
     player_job = scheduler.get_job(_PLAYER_JOB_ID)
     if player_job:
         player_job.remove()
+    flush_job = scheduler.get_job(_FLUSH_JOB_ID)
+    if flush_job:
+        flush_job.remove()
+    flush_state()
 
 
 command_rule = is_type(GroupMessageEvent) & to_me()
@@ -719,14 +845,15 @@ async def handle_add(event: GroupMessageEvent, args: Message = CommandArg()) ->
     if not ip:
         await mc_add_cmd.finish("Usage: ttd mc add <ip>")
 
-    async with _STATE_LOCK:
-        state = load_state()
-        added = add_server(state, int(event.group_id), ip)
-        if added:
-            save_state(state)
-            response = f"Server added: {ip}"
-        else:
-            response = f"Server already exists: {ip}"
+    state = load_state()
+    _ensure_server_index(state)
+    added = add_server(state, int(event.group_id), ip)
+    if added:
+        _index_add_server(int(event.group_id), ip)
+        schedule_flush()
+        response = f"Server added: {ip}"
+    else:
+        response = f"Server already exists: {ip}"
 
     await mc_add_cmd.finish(response)
 
@@ -740,15 +867,16 @@ async def handle_remove(event: GroupMessageEvent, args: Message = CommandArg())
     if not ip:
         await mc_remove_cmd.finish("Usage: ttd mc remove <ip>")
 
-    async with _STATE_LOCK:
-        state = load_state()
-        removed = remove_server(state, int(event.group_id), ip)
-        if removed:
-            save_state(state)
-            _clear_player_presence(int(event.group_id), ip)
-            response = f"Server removed: {ip}"
-        else:
-            response = f"Server not found: {ip}"
+    state = load_state()
+    _ensure_server_index(state)
+    removed = remove_server(state, int(event.group_id), ip)
+    if removed:
+        _index_remove_server(int(event.group_id), ip)
+        schedule_flush()
+        _clear_player_presence(int(event.group_id), ip)
+        response = f"Server removed: {ip}"
+    else:
+        response = f"Server not found: {ip}"
 
     await mc_remove_cmd.finish(response)
 
@@ -763,9 +891,9 @@ status_matcher = on_message(
 @status_matcher.handle()
 async def handle_status(event: GroupMessageEvent) -> None:
     source_group_id = int(event.group_id)
-    query_text = event.get_plaintext().strip()
+    query_text = _event_text(event)
     query_preset = _resolve_query_preset(query_text)
-    broadcast_messages: dict[int, list[str]] = {}
+    broadcast_messages: defaultdict[int, list[str]] = defaultdict(list)
 
     if query_preset is not None:
         if not query_preset.target_ip:
@@ -775,9 +903,8 @@ async def handle_status(event: GroupMessageEvent) -> None:
             )
         servers = [query_preset.target_ip]
     else:
-        async with _STATE_LOCK:
-            state = load_state()
-            servers = list(get_group_servers(state, source_group_id).keys())
+        state = load_state()
+        servers = list(get_group_servers(state, source_group_id).keys())
 
     if not servers:
         await status_matcher.finish("No servers configured for this group.")
@@ -787,66 +914,69 @@ async def handle_status(event: GroupMessageEvent) -> None:
     change_messages: list[str] = []
     blocks: list[str] = []
 
-    async with _STATE_LOCK:
-        state = load_state()
-        for result in results:
-            if query_preset is not None:
-                server_state = get_preset_state(state, query_preset.trigger)
-                display_name = query_preset.display_name
-                change_message = _apply_status_update(
-                    0,
-                    server_state,
+    state = load_state()
+    for result in results:
+        if query_preset is not None:
+            server_state = get_preset_state(state, query_preset.trigger)
+            display_name = query_preset.display_name
+            change_message = _apply_status_update(
+                0,
+                server_state,
+                result,
+                now,
+                display_name=display_name,
+            )
+            if change_message:
+                change_messages.append(change_message)
+                _queue_broadcast_messages(
+                    broadcast_messages,
+                    query_preset.broadcast_group_ids,
+                    change_message,
+                    exclude_group_id=source_group_id,
+                )
+        else:
+            server_state = get_server_state(state, source_group_id, result.ip)
+            display_name = None
+            change_message = _apply_status_update(
+                source_group_id,
+                server_state,
+                result,
+                now,
+                display_name=display_name,
+            )
+            if change_message:
+                change_messages.append(change_message)
+
+        if result.online:
+            blocks.append(
+                _format_online_result(
                     result,
+                    server_state,
                     now,
                     display_name=display_name,
                 )
-                if change_message:
-                    change_messages.append(change_message)
-                    _queue_broadcast_messages(
-                        broadcast_messages,
-                        query_preset.broadcast_group_ids,
-                        change_message,
-                        exclude_group_id=source_group_id,
-                    )
-            else:
-                server_state = get_server_state(state, source_group_id, result.ip)
-                display_name = None
-                change_message = _apply_status_update(
-                    source_group_id,
-                    server_state,
+            )
+        else:
+            blocks.append(
+                _format_offline_result(
                     result,
+                    server_state,
                     now,
                     display_name=display_name,
                 )
-                if change_message:
-                    change_messages.append(change_message)
-
-            if result.online:
-                blocks.append(
-                    _format_online_result(
-                        result,
-                        server_state,
-                        now,
-                        display_name=display_name,
-                    )
-                )
-            else:
-                blocks.append(
-                    _format_offline_result(
-                        result,
-                        server_state,
-                        now,
-                        display_name=display_name,
-                    )
-                )
-        save_state(state)
+            )
+    mark_state_dirty()
 
     message = "\n===\n".join(blocks)
     if change_messages:
         message = "Status changes:\n" + "\n".join(change_messages) + "\n\n" + message
 
-    for broadcast_group_id, messages in broadcast_messages.items():
-        if messages:
-            await _send_group_message(broadcast_group_id, "\n".join(messages))
+    await asyncio.gather(
+        *[
+            _send_group_message(broadcast_group_id, "\n".join(messages))
+            for broadcast_group_id, messages in broadcast_messages.items()
+        ],
+        return_exceptions=True,
+    )
 
     await status_matcher.finish(message)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import ast
 import json
+from functools import lru_cache
 from typing import Any
 
 from pydantic import BaseModel, Field, field_validator
@@ -13,6 +14,7 @@ class Config(BaseModel):
     mc_server_checker_player_poll_interval_seconds: int = 10
     mc_server_checker_player_debounce_seconds: int = 60
     mc_server_checker_timeout_seconds: int = 5
+    mc_server_checker_max_concurrency: int = 64
 
     @field_validator("mc_server_checker_admins", mode="before")
     @classmethod
@@ -20,21 +22,26 @@ class Config(BaseModel):
         if value is None:
             return []
         if isinstance(value, list):
-            return [int(v) for v in value if str(v).strip()]
+            return [int(v) for v in value if isinstance(v, int) or str(v).strip()]
         if isinstance(value, str):
-            raw = value.strip()
-            if not raw:
-                return []
-            parsed: Any = None
+            return list(_parse_admin_text(value.strip()))
+        return [int(value)]
+
+
+@lru_cache(maxsize=16)
+def _parse_admin_text(raw: str) -> tuple[int, ...]:
+    if not raw:
+        return ()
+    # Only bracketed input can be a JSON / Python list; plain "1, 2 3" skips both parsers.
+    if raw[0] in "[(":
+        parsed: Any = None
+        try:
+            parsed = json.loads(raw)
+        except Exception:
             try:
-                parsed = json.loads(raw)
+                parsed = ast.literal_eval(raw)
             except Exception:
-                try:
-                    parsed = ast.literal_eval(raw)
-                except Exception:
-                    parsed = None
-            if isinstance(parsed, list):
-                return [int(v) for v in parsed if str(v).strip()]
-            tokens = [t for t in raw.replace(",", " ").split() if t]
-            return [int(t) for t in tokens]
-        return [int(value)]
+                parsed = None
+        if isinstance(parsed, list):
+            return tuple(int(v) for v in parsed if str(v).strip())
+    return tuple(int(t) for t in raw.replace(",", " ").split())
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import os
 from pathlib import Path
 from typing import Any
 
 import nonebot_plugin_localstore as store
+import orjson
 
 
 DATA_FILE: Path = store.get_data_file(
@@ -17,26 +20,126 @@ PRESETS_FILE: Path = store.get_config_file(
 )
 
 
+# Parsed servers.json, kept in memory after the first read. Mutations go
+# through the live dict and are persisted by flush_state() when dirty.
+_STATE_CACHE: dict[str, Any] | None = None
+_STATE_DIRTY = False
+_FLUSH_DELAY_SECONDS = 1.0
+_FLUSH_TASK: asyncio.Task[None] | None = None
+
+
 def load_state() -> dict[str, Any]:
+    global _STATE_CACHE
+    if _STATE_CACHE is None:
+        _STATE_CACHE = _read_state()
+    return _STATE_CACHE
+
+
+async def preload_state() -> None:
+    """Read servers.json off the event loop so later load_state() calls hit the cache."""
+    global _STATE_CACHE
+    if _STATE_CACHE is not None:
+        return
+    state = await asyncio.to_thread(_read_state)
+    if _STATE_CACHE is None:
+        _STATE_CACHE = state
+
+
+def mark_state_dirty() -> None:
+    global _STATE_DIRTY
+    _STATE_DIRTY = True
+
+
+def flush_state() -> bool:
+    global _STATE_DIRTY
+    if not _STATE_DIRTY or _STATE_CACHE is None:
+        return False
+    save_state(_STATE_CACHE)
+    _STATE_DIRTY = False
+    return True
+
+
+async def flush_state_async() -> bool:
+    """Like flush_state(), but the file write runs in a worker thread.
+
+    The state is serialised on the loop first, so the thread never sees a
+    dict that handlers are still mutating.
+    """
+    global _STATE_DIRTY
+    if not _STATE_DIRTY or _STATE_CACHE is None:
+        return False
+    payload = _dump_state(_STATE_CACHE)
+    _STATE_DIRTY = False
+    try:
+        await asyncio.to_thread(_write_state, payload)
+    except Exception:
+        _STATE_DIRTY = True
+        raise
+    return True
+
+
+def schedule_flush() -> None:
+    """Mark the state dirty and write it once after a short delay.
+
+    Changes made within the delay are coalesced into the same write.
+    """
+    global _FLUSH_TASK
+    mark_state_dirty()
+    if _FLUSH_TASK is None or _FLUSH_TASK.done():
+        _FLUSH_TASK = asyncio.get_running_loop().create_task(_delayed_flush())
+
+
+async def _delayed_flush() -> None:
+    await asyncio.sleep(_FLUSH_DELAY_SECONDS)
+    await flush_state_async()
+
+
+def _read_state() -> dict[str, Any]:
     if not DATA_FILE.exists():
         return {"groups": {}}
     try:
-        with DATA_FILE.open("r", encoding="utf-8") as handle:
-            data = json.load(handle)
+        data = orjson.loads(DATA_FILE.read_bytes())
     except Exception:
         return {"groups": {}}
     if not isinstance(data, dict):
         return {"groups": {}}
     groups = data.get("groups")
-    if not isinstance(groups, dict):
-        data["groups"] = {}
+    # JSON only allows string keys; group ids are ints everywhere in memory.
+    data["groups"] = _int_group_keys(groups) if isinstance(groups, dict) else {}
     return data
 
 
+def _int_group_keys(groups: dict[str, Any]) -> dict[int, Any]:
+    parsed: dict[int, Any] = {}
+    for group_key, group_data in groups.items():
+        try:
+            parsed[int(group_key)] = group_data
+        except ValueError:
+            continue
+    return parsed
+
+
+def _dump_state(state: dict[str, Any]) -> bytes:
+    data = {
+        **state,
+        "groups": {
+            str(group_id): group_data
+            for group_id, group_data in state.get("groups", {}).items()
+        },
+    }
+    return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+
+
 def save_state(state: dict[str, Any]) -> None:
+    _write_state(_dump_state(state))
+
+
+def _write_state(payload: bytes) -> None:
     DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with DATA_FILE.open("w", encoding="utf-8") as handle:
-        json.dump(state, handle, ensure_ascii=True, indent=2, sort_keys=True)
+    # Write a sibling file and swap it in so a crash never leaves a truncated file.
+    tmp_path = DATA_FILE.with_suffix(DATA_FILE.suffix + ".tmp")
+    tmp_path.write_bytes(payload)
+    os.replace(tmp_path, DATA_FILE)
 
 
 def _parse_group_ids(value: Any) -> list[int]:
@@ -100,9 +203,15 @@ def load_presets() -> dict[str, dict[str, Any]]:
 
 
 def get_group_servers(state: dict[str, Any], group_id: int) -> dict[str, Any]:
+    # Read-only: a lookup for an unknown group must not add it to the cached state.
+    group = state.get("groups", {}).get(group_id)
+    servers = group.get("servers") if isinstance(group, dict) else None
+    return servers if isinstance(servers, dict) else {}
+
+
+def _ensure_group_servers(state: dict[str, Any], group_id: int) -> dict[str, Any]:
     groups = state.setdefault("groups", {})
-    group_key = str(group_id)
-    group = groups.setdefault(group_key, {})
+    group = groups.setdefault(group_id, {})
     servers = group.setdefault("servers", {})
     if not isinstance(servers, dict):
         servers = {}
@@ -111,7 +220,7 @@ def get_group_servers(state: dict[str, Any], group_id: int) -> dict[str, Any]:
 
 
 def get_server_state(state: dict[str, Any], group_id: int, ip: str) -> dict[str, Any]:
-    servers = get_group_servers(state, group_id)
+    servers = _ensure_group_servers(state, group_id)
     server_state = servers.setdefault(ip, {})
     if not isinstance(server_state, dict):
         server_state = {}
@@ -134,17 +243,17 @@ def get_preset_state(state: dict[str, Any], trigger: str) -> dict[str, Any]:
 
 
 def add_server(state: dict[str, Any], group_id: int, ip: str) -> bool:
-    servers = get_group_servers(state, group_id)
+    servers = _ensure_group_servers(state, group_id)
     if ip in servers:
         return False
     servers[ip] = {}
+    mark_state_dirty()
     return True
 
 
 def remove_server(state: dict[str, Any], group_id: int, ip: str) -> bool:
     groups = state.get("groups", {})
-    group_key = str(group_id)
-    group = groups.get(group_key)
+    group = groups.get(group_id)
     if not isinstance(group, dict):
         return False
     servers = group.get("servers")
@@ -152,5 +261,6 @@ def remove_server(state: dict[str, Any], group_id: int, ip: str) -> bool:
         return False
     servers.pop(ip, None)
     if not servers:
-        groups.pop(group_key, None)
+        groups.pop(group_id, None)
+    mark_state_dirty()
     return True
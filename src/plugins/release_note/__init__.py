@@ -1,20 +1,27 @@
-import ast
+import asyncio
+import importlib.util
 import json
 import logging
 import os
-from typing import Any, Optional
-
-from nonebot import get_bots, get_driver, on_command, require
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Optional
+
+import orjson
+from nonebot import get_bots, get_driver, on_command
 from nonebot.permission import SUPERUSER
 from nonebot.plugin import PluginMetadata
 
 logger = logging.getLogger(__name__)
 
-require("nonebot_plugin_apscheduler")
-from nonebot_plugin_apscheduler import scheduler
-
 from .config import plugin_config
 
+if TYPE_CHECKING:
+    import httpx
+
 __plugin_meta__ = PluginMetadata(
     name="release-note",
     description="自动发布版本更新日志",
@@ -23,7 +30,19 @@ __plugin_meta__ = PluginMetadata(
 
 GITHUB_API_BASE = f"https://api.github.com/repos/{plugin_config.github_repo_owner}/{plugin_config.github_repo_name}"
 LAST_DEPLOYED_TAG = plugin_config.last_deployed_tag
+_GITHUB_TOKEN = plugin_config.github_token or None
+_GITHUB_HEADERS = MappingProxyType({
+    "Accept": "application/vnd.github.v3+json",
+    **({"Authorization": f"token {_GITHUB_TOKEN}"} if _GITHUB_TOKEN else {}),
+})
+_GITHUB_SHA_HEADERS = MappingProxyType({"Accept": "application/vnd.github.sha"})
 MAX_LONGNICK_LENGTH = 80
+STARTUP_CHECK_DELAY_SECONDS = 5
+_LONGNICK_WORD_RE = re.compile(r"\S+")
+_SUPERUSER_SPLIT_RE = re.compile(r"[,\s\[\]()\"']+")
+_TAG_RESOLVE_CONCURRENCY = 10
+_TAG_PAGE_SIZE = 100
+VERSION_TAG_PREFIX = "v"
 
 GITHUB_AUTH_FAILURE_HINTS = (
     "bad credentials",
@@ -31,8 +50,28 @@ GITHUB_AUTH_FAILURE_HINTS = (
     "requires authentication",
     "resource not accessible by personal access token",
 )
+_GITHUB_AUTH_FAILURE_RE = re.compile(
+    "|".join(map(re.escape, GITHUB_AUTH_FAILURE_HINTS)),
+    re.IGNORECASE,
+)
+
+# Alert keys are mostly fixed strings; cap the dedup set in case one ever varies
+_ALERT_KEYS_SENT: "OrderedDict[str, None]" = OrderedDict()
+_ALERT_KEYS_SENT_MAX = 256
+# Held so the one-shot startup check isn't garbage collected mid-sleep.
+_STARTUP_CHECK_TASK: Optional[asyncio.Task] = None
+# Resolved once; a miss is retried on the next alert.
+_PRIMARY_SUPERUSER: Optional[int] = None
 
-_ALERT_KEYS_SENT: set[str] = set()
+# One keep-alive client for every GitHub call, created on first use.
+_HTTP_CLIENT: Optional["httpx.AsyncClient"] = None
+_HTTP_CONNECT_RETRIES = 3
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Cache key -> (fetched at, ETag, parsed body); least recently used goes first
+_RESPONSE_CACHE: "OrderedDict[str, tuple[float, Optional[str], Any]]" = OrderedDict()
+_RESPONSE_CACHE_MAX = 256
+_RESPONSE_CACHE_TTL_SECONDS = 60
 
 driver = get_driver()
 
@@ -42,40 +81,42 @@ def _parse_superusers(value: str) -> list[str]:
     if not raw:
         return []
 
-    parsed: Any = None
-    try:
-        parsed = json.loads(raw)
-    except Exception:
+    if raw[0] in '["':
         try:
-            parsed = ast.literal_eval(raw)
-        except Exception:
+            parsed: Any = json.loads(raw)
+        except ValueError:
             parsed = None
 
-    if isinstance(parsed, (list, tuple, set)):
-        return [str(item).strip().strip('"\'') for item in parsed if str(item).strip()]
+        if isinstance(parsed, list):
+            return [str(item).strip().strip('"\'') for item in parsed if str(item).strip()]
 
-    if isinstance(parsed, str) and parsed.strip():
-        return [parsed.strip().strip('"\'')]
+        if isinstance(parsed, str) and parsed.strip():
+            return [parsed.strip().strip('"\'')]
 
-    return [item.strip().strip('"\'') for item in raw.replace(",", " ").split() if item.strip()]
+    # Python-style or bare lists: the brackets and quotes are just separators.
+    return [item for item in _SUPERUSER_SPLIT_RE.split(raw) if item]
 
 
 def _resolve_primary_superuser() -> Optional[int]:
+    global _PRIMARY_SUPERUSER
+    if _PRIMARY_SUPERUSER is not None:
+        return _PRIMARY_SUPERUSER
+
     env_value = os.getenv("SUPERUSERS", "")
     candidates = _parse_superusers(env_value)
 
     if not candidates:
-        fallback_superusers = getattr(driver.config, "superusers", set())
-        if fallback_superusers:
-            normalized = [str(item).strip() for item in fallback_superusers if str(item).strip()]
-            candidates = sorted(
-                normalized,
-                key=lambda item: (not item.isdigit(), int(item) if item.isdigit() else item),
-            )
+        # driver.config.superusers is an unordered set; use the smallest numeric id.
+        fallback_superusers = (str(item).strip() for item in getattr(driver.config, "superusers", ()))
+        user_ids = [int(item) for item in fallback_superusers if item.isdigit()]
+        if user_ids:
+            _PRIMARY_SUPERUSER = min(user_ids)
+            return _PRIMARY_SUPERUSER
 
     for candidate in candidates:
         if candidate.isdigit():
-            return int(candidate)
+            _PRIMARY_SUPERUSER = int(candidate)
+            return _PRIMARY_SUPERUSER
 
     logger.warning("No valid superuser found for release-note alert")
     return None
@@ -105,7 +146,9 @@ async def _send_private_alert_once(key: str, message: str) -> bool:
     if key in _ALERT_KEYS_SENT:
         return False
 
-    _ALERT_KEYS_SENT.add(key)
+    _ALERT_KEYS_SENT[key] = None
+    if len(_ALERT_KEYS_SENT) > _ALERT_KEYS_SENT_MAX:
+        _ALERT_KEYS_SENT.popitem(last=False)
     return await _send_private_alert(message)
 
 
@@ -120,12 +163,23 @@ def _is_github_auth_failure(status_code: int, body_text: str) -> bool:
     if status_code not in (401, 403):
         return False
 
-    normalized_text = (body_text or "").lower()
-    return any(keyword in normalized_text for keyword in GITHUB_AUTH_FAILURE_HINTS)
+    return bool(body_text) and _GITHUB_AUTH_FAILURE_RE.search(body_text) is not None
 
 
-def _normalize_longnick_text(text: str) -> str:
-    return " ".join(text.split()).strip()
+def _normalize_longnick_text(text: str, max_length: Optional[int] = None) -> str:
+    if max_length is None:
+        return " ".join(text.split())
+
+    # Tag messages can carry a long body; stop collecting words once the
+    # normalized text is known to exceed max_length.
+    words = []
+    length = -1
+    for match in _LONGNICK_WORD_RE.finditer(text):
+        words.append(match.group())
+        length += len(words[-1]) + 1
+        if length > max_length:
+            break
+    return " ".join(words)
 
 
 def _fit_longnick_text(text: str, max_length: int = MAX_LONGNICK_LENGTH) -> str:
@@ -150,13 +204,6 @@ async def _notify_github_auth_failure(operation: str, status_code: int, body_tex
     return await _send_private_alert_once("github-auth-invalid", message)
 
 
-async def get_github_token() -> Optional[str]:
-    token = plugin_config.github_token
-    if not token:
-        logger.warning("GITHUB_TOKEN not found in configuration")
-    return token
-
-
 async def get_current_version() -> Optional[str]:
     version = os.getenv("VERSION")
     if not version:
@@ -164,81 +211,174 @@ async def get_current_version() -> Optional[str]:
     return version
 
 
+async def _get_client() -> "httpx.AsyncClient":
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None or _HTTP_CLIENT.is_closed:
+        import httpx
+
+        # Connection failures are retried by the transport; HTTP error
+        # statuses still reach the helpers below.
+        transport = httpx.AsyncHTTPTransport(
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+            retries=_HTTP_CONNECT_RETRIES,
+        )
+        _HTTP_CLIENT = httpx.AsyncClient(
+            base_url=GITHUB_API_BASE,
+            headers=_GITHUB_HEADERS,
+            timeout=30.0,
+            transport=transport,
+        )
+    return _HTTP_CLIENT
+
+
+def _json(response: "httpx.Response") -> Any:
+    # orjson parses the raw bytes directly, skipping httpx's decode-to-str hop.
+    return orjson.loads(response.content)
+
+
+@dataclass(frozen=True)
+class _GitHubResponse:
+    """Outcome of a cached GET: the parsed body on success, the raw text otherwise."""
+
+    status_code: int
+    data: Any = None
+    text: str = ""
+
+    @property
+    def is_success(self) -> bool:
+        return 200 <= self.status_code < 300
+
+
+async def _cached_get(
+    url: str,
+    params: Optional[dict] = None,
+    headers: Optional[Mapping[str, str]] = None,
+    parse: Callable[["httpx.Response"], Any] = _json,
+) -> _GitHubResponse:
+    """GET through the shared client, reusing recently parsed 200 bodies.
+
+    Only the ETag and the parsed body are kept. Within the TTL the body is
+    returned as is; after it, the request is revalidated with If-None-Match
+    so an unchanged resource costs a 304, which GitHub does not count
+    against the rate limit.
+    """
+    client = await _get_client()
+    request = client.build_request("GET", url, params=params, headers=headers)
+    # The media type changes the body, so it is part of the key.
+    cache_key = f"{request.url} {request.headers.get('Accept')}"
+    cached = _RESPONSE_CACHE.get(cache_key)
+    now = time.monotonic()
+    if cached is not None:
+        _RESPONSE_CACHE.move_to_end(cache_key)
+        cached_at, etag, data = cached
+        if now - cached_at < _RESPONSE_CACHE_TTL_SECONDS:
+            return _GitHubResponse(200, data)
+        if etag:
+            request.headers["If-None-Match"] = etag
+
+    response = await client.send(request)
+    if response.status_code == 304 and cached is not None:
+        _RESPONSE_CACHE[cache_key] = (now, etag, data)
+        return _GitHubResponse(200, data)
+    if not response.is_success:
+        return _GitHubResponse(response.status_code, text=response.text)
+
+    data = parse(response)
+    if response.status_code == 200:
+        _RESPONSE_CACHE[cache_key] = (now, response.headers.get("ETag"), data)
+        if len(_RESPONSE_CACHE) > _RESPONSE_CACHE_MAX:
+            _RESPONSE_CACHE.popitem(last=False)
+    return _GitHubResponse(response.status_code, data)
+
+
+def _invalidate_cached_tag(tag_name: str) -> None:
+    paths = (f"/git/refs/tags/{tag_name} ", f"/commits/refs/tags/{tag_name} ")
+    for cache_key in [key for key in _RESPONSE_CACHE if any(path in key for path in paths)]:
+        del _RESPONSE_CACHE[cache_key]
+
+
+@driver.on_shutdown
+async def _close_client() -> None:
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is not None:
+        await _HTTP_CLIENT.aclose()
+        _HTTP_CLIENT = None
+
+
 async def get_tag_commit_sha(tag_name: str) -> Optional[str]:
-    tag_ref = await _get_tag_ref(tag_name)
-    if tag_ref is None:
-        return None
+    # /commits/{ref} peels annotated tags server-side, and the sha media type
+    # makes the body just the commit SHA, so this is always one request. The
+    # fully qualified ref keeps a same-named branch from shadowing the tag.
+    try:
+        response = await _cached_get(
+            f"/commits/refs/tags/{tag_name}",
+            headers=_GITHUB_SHA_HEADERS,
+            parse=lambda raw: raw.text.strip(),
+        )
 
-    return await _resolve_tag_commit_sha(tag_name, tag_ref)
+        if response.is_success:
+            return response.data
 
+        if response.status_code in (404, 422):
+            logger.info("Tag %s not found", tag_name)
+            return None
 
-async def _get_tag_ref(tag_name: str) -> Optional[dict]:
-    import httpx
+        await _notify_github_auth_failure(
+            "get_tag_commit_sha",
+            response.status_code,
+            response.text,
+        )
+        logger.error("Failed to get tag %s: %s", tag_name, response.status_code)
+        return None
+    except Exception as exc:
+        logger.error("Error getting tag commit SHA: %s", exc)
+        return None
 
-    try:
-        async with httpx.AsyncClient() as client:
-            headers = {"Accept": "application/vnd.github.v3+json"}
-            token = await get_github_token()
-            if token:
-                headers["Authorization"] = f"token {token}"
-
-            response = await client.get(
-                f"{GITHUB_API_BASE}/git/refs/tags/{tag_name}",
-                headers=headers,
-                timeout=30.0,
-            )
 
-            if response.status_code == 200:
-                return response.json()
+async def _get_tag_ref(tag_name: str) -> Optional[dict]:
+    try:
+        response = await _cached_get(f"/git/refs/tags/{tag_name}")
 
-            if response.status_code == 404:
-                logger.info("Tag %s not found", tag_name)
-                return None
+        if response.is_success:
+            return response.data
 
-            await _notify_github_auth_failure(
-                "_get_tag_ref",
-                response.status_code,
-                response.text,
-            )
-            logger.error("Failed to get tag %s: %s", tag_name, response.status_code)
+        if response.status_code == 404:
+            logger.info("Tag %s not found", tag_name)
             return None
+
+        await _notify_github_auth_failure(
+            "_get_tag_ref",
+            response.status_code,
+            response.text,
+        )
+        logger.error("Failed to get tag %s: %s", tag_name, response.status_code)
+        return None
     except Exception as exc:
         logger.error("Error getting tag ref: %s", exc)
         return None
 
 
 async def _resolve_tag_commit_sha(tag_name: str, tag_ref: dict) -> Optional[str]:
-    import httpx
-
     try:
         if tag_ref["object"]["type"] != "tag":
             return tag_ref["object"]["sha"]
 
-        async with httpx.AsyncClient() as client:
-            headers = {"Accept": "application/vnd.github.v3+json"}
-            token = await get_github_token()
-            if token:
-                headers["Authorization"] = f"token {token}"
-
-            tag_response = await client.get(
-                tag_ref["object"]["url"],
-                headers=headers,
-                timeout=30.0,
-            )
-            if tag_response.status_code == 200:
-                return tag_response.json()["object"]["sha"]
-
-            await _notify_github_auth_failure(
-                "get_tag_commit_sha:resolve_annotated_tag",
-                tag_response.status_code,
-                tag_response.text,
-            )
-            logger.error(
-                "Failed to resolve annotated tag %s: %s",
-                tag_name,
-                tag_response.status_code,
-            )
-            return None
+        tag_response = await _cached_get(tag_ref["object"]["url"])
+        if tag_response.is_success:
+            return tag_response.data["object"]["sha"]
+
+        await _notify_github_auth_failure(
+            "get_tag_commit_sha:resolve_annotated_tag",
+            tag_response.status_code,
+            tag_response.text,
+        )
+        logger.error(
+            "Failed to resolve annotated tag %s: %s",
+            tag_name,
+            tag_response.status_code,
+        )
+        return None
     except Exception as exc:
         logger.error("Error resolving tag commit SHA: %s", exc)
         return None
@@ -249,240 +389,215 @@ async def get_tag_message(tag_name: str) -> Optional[str]:
     if tag_ref is None:
         return None
 
-    import httpx
-
     try:
-        headers = {"Accept": "application/vnd.github.v3+json"}
-        token = await get_github_token()
-        if token:
-            headers["Authorization"] = f"token {token}"
-
-        async with httpx.AsyncClient() as client:
-            if tag_ref["object"]["type"] == "tag":
-                tag_response = await client.get(
-                    tag_ref["object"]["url"],
-                    headers=headers,
-                    timeout=30.0,
-                )
-                if tag_response.status_code != 200:
-                    await _notify_github_auth_failure(
-                        "get_tag_message:resolve_annotated_tag",
-                        tag_response.status_code,
-                        tag_response.text,
-                    )
-                    logger.error(
-                        "Failed to resolve annotated tag message %s: %s",
-                        tag_name,
-                        tag_response.status_code,
-                    )
-                    return None
-
-                message = str(tag_response.json().get("message", "")).splitlines()[0].strip()
-                return message or tag_response.json().get("tag") or None
-
-            commit_response = await client.get(
-                tag_ref["object"]["url"],
-                headers=headers,
-                timeout=30.0,
-            )
-            if commit_response.status_code != 200:
+        if tag_ref["object"]["type"] == "tag":
+            tag_response = await _cached_get(tag_ref["object"]["url"])
+            if not tag_response.is_success:
                 await _notify_github_auth_failure(
-                    "get_tag_message:resolve_lightweight_tag",
-                    commit_response.status_code,
-                    commit_response.text,
+                    "get_tag_message:resolve_annotated_tag",
+                    tag_response.status_code,
+                    tag_response.text,
                 )
                 logger.error(
-                    "Failed to resolve lightweight tag message %s: %s",
+                    "Failed to resolve annotated tag message %s: %s",
                     tag_name,
-                    commit_response.status_code,
+                    tag_response.status_code,
                 )
                 return None
 
-            return str(commit_response.json()["commit"]["message"]).splitlines()[0].strip()
+            tag_data = tag_response.data
+            message = str(tag_data.get("message", "")).partition("\n")[0].strip()
+            return message or tag_data.get("tag") or None
+
+        commit_response = await _cached_get(tag_ref["object"]["url"])
+        if not commit_response.is_success:
+            await _notify_github_auth_failure(
+                "get_tag_message:resolve_lightweight_tag",
+                commit_response.status_code,
+                commit_response.text,
+            )
+            logger.error(
+                "Failed to resolve lightweight tag message %s: %s",
+                tag_name,
+                commit_response.status_code,
+            )
+            return None
+
+        message = str(commit_response.data["commit"]["message"]).partition("\n")[0].strip()
+        return message or None
     except Exception as exc:
         logger.error("Error getting tag message: %s", exc)
         return None
 
 
 async def get_commits_between(base_sha: Optional[str], head_sha: str) -> list[dict]:
-    import httpx
-
     try:
-        async with httpx.AsyncClient() as client:
-            headers = {"Accept": "application/vnd.github.v3+json"}
-            token = await get_github_token()
-            if token:
-                headers["Authorization"] = f"token {token}"
-
-            if base_sha:
-                response = await client.get(
-                    f"{GITHUB_API_BASE}/compare/{base_sha}...{head_sha}",
-                    headers=headers,
-                    timeout=30.0,
-                )
-            else:
-                response = await client.get(
-                    f"{GITHUB_API_BASE}/commits",
-                    params={"sha": head_sha, "per_page": 10},
-                    headers=headers,
-                    timeout=30.0,
-                )
-
-            if response.status_code == 200:
-                data = response.json()
-                if base_sha and "commits" in data:
-                    return data["commits"]
-                if not base_sha:
-                    return data
-                return []
-
-            await _notify_github_auth_failure(
-                "get_commits_between",
-                response.status_code,
-                response.text,
+        if base_sha:
+            response = await _cached_get(f"/compare/{base_sha}...{head_sha}")
+        else:
+            response = await _cached_get(
+                "/commits",
+                params={"sha": head_sha, "per_page": 10},
             )
-            logger.error("Failed to get commits: %s", response.status_code)
+
+        if response.is_success:
+            data = response.data
+            if base_sha and "commits" in data:
+                return data["commits"]
+            if not base_sha:
+                return data
             return []
+
+        await _notify_github_auth_failure(
+            "get_commits_between",
+            response.status_code,
+            response.text,
+        )
+        logger.error("Failed to get commits: %s", response.status_code)
+        return []
     except Exception as exc:
         logger.error("Error getting commits: %s", exc)
         return []
 
 
 async def get_commit_count_between(base_sha: Optional[str], head_sha: str) -> int:
-    import httpx
-
     try:
-        async with httpx.AsyncClient() as client:
-            headers = {"Accept": "application/vnd.github.v3+json"}
-            token = await get_github_token()
-            if token:
-                headers["Authorization"] = f"token {token}"
-
-            if base_sha:
-                response = await client.get(
-                    f"{GITHUB_API_BASE}/compare/{base_sha}...{head_sha}",
-                    headers=headers,
-                    timeout=30.0,
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    ahead_by = data.get("ahead_by")
-                    if isinstance(ahead_by, int):
-                        return ahead_by
-                    commits = data.get("commits", [])
-                    return len(commits) if isinstance(commits, list) else 0
-            else:
-                response = await client.get(
-                    f"{GITHUB_API_BASE}/commits",
-                    params={"sha": head_sha, "per_page": 100},
-                    headers=headers,
-                    timeout=30.0,
-                )
-                if response.status_code == 200:
-                    commits = response.json()
-                    return len(commits) if isinstance(commits, list) else 0
-
-            await _notify_github_auth_failure(
-                "get_commit_count_between",
-                response.status_code,
-                response.text,
+        if base_sha:
+            response = await _cached_get(f"/compare/{base_sha}...{head_sha}")
+            if response.is_success:
+                data = response.data
+                ahead_by = data.get("ahead_by")
+                if isinstance(ahead_by, int):
+                    return ahead_by
+                commits = data.get("commits", [])
+                return len(commits) if isinstance(commits, list) else 0
+        else:
+            response = await _cached_get(
+                "/commits",
+                params={"sha": head_sha, "per_page": 100},
             )
-            logger.error("Failed to get commit count: %s", response.status_code)
-            return 0
+            if response.is_success:
+                commits = response.data
+                return len(commits) if isinstance(commits, list) else 0
+
+        await _notify_github_auth_failure(
+            "get_commit_count_between",
+            response.status_code,
+            response.text,
+        )
+        logger.error("Failed to get commit count: %s", response.status_code)
+        return 0
     except Exception as exc:
         logger.error("Error getting commit count: %s", exc)
         return 0
 
 
-async def get_version_tags_at_commit(commit_sha: str) -> list[str]:
-    import httpx
-
-    try:
-        async with httpx.AsyncClient() as client:
-            headers = {"Accept": "application/vnd.github.v3+json"}
-            token = await get_github_token()
-            if token:
-                headers["Authorization"] = f"token {token}"
-
-            response = await client.get(
-                f"{GITHUB_API_BASE}/git/refs/tags",
-                headers=headers,
-                timeout=30.0,
+async def _list_version_tag_refs() -> Optional[list[dict]]:
+    tag_refs: list[dict] = []
+    page = 1
+    while True:
+        response = await _cached_get(
+            f"/git/matching-refs/tags/{VERSION_TAG_PREFIX}",
+            params={"per_page": _TAG_PAGE_SIZE, "page": page},
+        )
+        if not response.is_success:
+            await _notify_github_auth_failure(
+                "get_version_tags_at_commit",
+                response.status_code,
+                response.text,
             )
+            logger.error("Failed to get tags: %s", response.status_code)
+            return None
 
-            if response.status_code != 200:
-                await _notify_github_auth_failure(
-                    "get_version_tags_at_commit",
-                    response.status_code,
-                    response.text,
-                )
-                logger.error("Failed to get tags: %s", response.status_code)
-                return []
+        batch = response.data
+        tag_refs.extend(batch)
+        if len(batch) < _TAG_PAGE_SIZE:
+            return tag_refs
+        page += 1
 
-            all_tags = response.json()
-            version_tags = []
 
-            for tag_ref in all_tags:
-                tag_name = tag_ref["ref"].replace("refs/tags/", "")
-                tag_sha = tag_ref["object"]["sha"]
-                if tag_name == LAST_DEPLOYED_TAG:
-                    continue
-                if tag_sha == commit_sha:
-                    version_tags.append(tag_name)
+async def get_version_tags_at_commit(commit_sha: str) -> list[str]:
+    try:
+        all_tags = await _list_version_tag_refs()
+        if all_tags is None:
+            return []
 
-            return version_tags
+        version_tags = []
+        annotated_refs: list[tuple[str, dict]] = []
+
+        for tag_ref in all_tags:
+            tag_name = tag_ref["ref"].replace("refs/tags/", "")
+            if tag_name == LAST_DEPLOYED_TAG:
+                continue
+            if tag_ref["object"]["type"] == "tag":
+                annotated_refs.append((tag_name, tag_ref))
+            elif tag_ref["object"]["sha"] == commit_sha:
+                version_tags.append(tag_name)
+
+        # Annotated tags point at a tag object; dereference them concurrently.
+        semaphore = asyncio.Semaphore(_TAG_RESOLVE_CONCURRENCY)
+
+        async def resolve(tag_name: str, tag_ref: dict) -> Optional[str]:
+            async with semaphore:
+                return await _resolve_tag_commit_sha(tag_name, tag_ref)
+
+        resolved = await asyncio.gather(
+            *(resolve(tag_name, tag_ref) for tag_name, tag_ref in annotated_refs),
+            return_exceptions=True,
+        )
+        for (tag_name, _), tag_sha in zip(annotated_refs, resolved):
+            if tag_sha == commit_sha:
+                version_tags.append(tag_name)
+
+        return version_tags
     except Exception as exc:
         logger.error("Error getting version tags at commit: %s", exc)
         return []
 
 
 async def update_tag(tag_name: str, commit_sha: str, token: str) -> bool:
-    import httpx
-
     try:
-        async with httpx.AsyncClient() as client:
-            headers = {
-                "Accept": "application/vnd.github.v3+json",
-                "Authorization": f"token {token}",
-            }
-
-            delete_response = await client.delete(
-                f"{GITHUB_API_BASE}/git/refs/tags/{tag_name}",
-                headers=headers,
-                timeout=30.0,
-            )
+        client = await _get_client()
+        # The shared client already sends the configured token.
+        headers = None if token == _GITHUB_TOKEN else {"Authorization": f"token {token}"}
 
-            if delete_response.status_code not in (204, 404):
-                await _notify_github_auth_failure(
-                    "update_tag:delete",
-                    delete_response.status_code,
-                    delete_response.text,
-                )
-                logger.error("Failed to delete old tag: %s", delete_response.status_code)
-                return False
-
-            create_response = await client.post(
-                f"{GITHUB_API_BASE}/git/refs",
-                headers=headers,
-                json={"ref": f"refs/tags/{tag_name}", "sha": commit_sha},
-                timeout=30.0,
-            )
-
-            if create_response.status_code == 201:
-                logger.info("Successfully updated tag %s to %s", tag_name, commit_sha)
-                return True
+        delete_response = await client.delete(
+            f"/git/refs/tags/{tag_name}",
+            headers=headers,
+        )
+        _invalidate_cached_tag(tag_name)
 
+        if not (delete_response.is_success or delete_response.status_code == 404):
             await _notify_github_auth_failure(
-                "update_tag:create",
-                create_response.status_code,
-                create_response.text,
-            )
-            logger.error(
-                "Failed to create tag: %s, %s",
-                create_response.status_code,
-                create_response.text,
+                "update_tag:delete",
+                delete_response.status_code,
+                delete_response.text,
             )
+            logger.error("Failed to delete old tag: %s", delete_response.status_code)
             return False
+
+        create_response = await client.post(
+            "/git/refs",
+            headers=headers,
+            json={"ref": f"refs/tags/{tag_name}", "sha": commit_sha},
+        )
+
+        if create_response.is_success:
+            _invalidate_cached_tag(tag_name)
+            logger.info("Successfully updated tag %s to %s", tag_name, commit_sha)
+            return True
+
+        await _notify_github_auth_failure(
+            "update_tag:create",
+            create_response.status_code,
+            create_response.text,
+        )
+        logger.error(
+            "Failed to create tag: %s, %s",
+            create_response.status_code,
+            create_response.text,
+        )
+        return False
     except Exception as exc:
         logger.error("Error updating tag: %s", exc)
         return False
@@ -523,26 +638,23 @@ async def publish_release_note(release_note: str) -> bool:
 
 
 def format_release_note(version: str, tag_message: str, commit_count: int) -> str:
-    prefix = _normalize_longnick_text(version)
-    summary = _normalize_longnick_text(tag_message) or "deploy"
+    prefix = _normalize_longnick_text(version) or "deploy"
     suffix = f" (+{max(commit_count, 0)})"
 
-    if not prefix:
-        prefix = "deploy"
-
     base = f"{prefix}: "
     max_summary_length = MAX_LONGNICK_LENGTH - len(base) - len(suffix)
     if max_summary_length < 1:
         return _fit_longnick_text(f"{prefix}{suffix}")
 
+    summary = _normalize_longnick_text(tag_message, max_summary_length) or "deploy"
     if len(summary) > max_summary_length:
         summary = summary[:max_summary_length].rstrip(" .,;:，。；：-_+/")
         if not summary:
             summary = "deploy"
             summary = summary[:max_summary_length]
 
-    release_note = f"{base}{summary}{suffix}"
-    return _fit_longnick_text(release_note)
+    # Every part is already normalized and the summary was sized to fit.
+    return f"{base}{summary}{suffix}"
 
 
 async def check_and_publish_release_note() -> None:
@@ -554,12 +666,14 @@ async def check_and_publish_release_note() -> None:
             logger.warning("Current version not available, skipping release note")
             return
 
-        current_sha = await get_tag_commit_sha(current_version)
+        current_sha, last_deployed_sha = await asyncio.gather(
+            get_tag_commit_sha(current_version),
+            get_tag_commit_sha(LAST_DEPLOYED_TAG),
+        )
         if not current_sha:
             logger.warning("Could not find commit SHA for version %s", current_version)
             return
 
-        last_deployed_sha = await get_tag_commit_sha(LAST_DEPLOYED_TAG)
         if last_deployed_sha and last_deployed_sha == current_sha:
             logger.info("No new commits since last deployment")
             return
@@ -579,11 +693,10 @@ async def check_and_publish_release_note() -> None:
         published = await publish_release_note(release_note)
         logger.info("Release note published: %s\nContent:\n%s", published, release_note)
 
-        github_token = await get_github_token()
-        if github_token:
-            await update_tag(LAST_DEPLOYED_TAG, current_sha, github_token)
+        if _GITHUB_TOKEN:
+            await update_tag(LAST_DEPLOYED_TAG, current_sha, _GITHUB_TOKEN)
         else:
-            logger.warning("GitHub token not available, cannot update last-deployed tag")
+            logger.warning("GITHUB_TOKEN not found in configuration, cannot update last-deployed tag")
             await _send_private_alert_once(
                 "github-token-missing",
                 "[release-note] GitHub token missing before update_tag. "
@@ -595,20 +708,16 @@ async def check_and_publish_release_note() -> None:
         logger.error("Error in check_and_publish_release_note: %s", exc)
 
 
+async def _delayed_release_note_check() -> None:
+    await asyncio.sleep(STARTUP_CHECK_DELAY_SECONDS)
+    await check_and_publish_release_note()
+
+
 @driver.on_startup
 async def on_startup() -> None:
+    global _STARTUP_CHECK_TASK
     logger.info("Bot started, scheduling release note check...")
-    from datetime import datetime, timedelta
-
-    run_time = datetime.now() + timedelta(seconds=5)
-    scheduler.add_job(
-        check_and_publish_release_note,
-        "date",
-        run_date=run_time,
-        id="release_note_check",
-        replace_existing=True,
-        misfire_grace_time=60,
-    )
+    _STARTUP_CHECK_TASK = asyncio.create_task(_delayed_release_note_check())
 
 
 check_release = on_command("检查更新", permission=SUPERUSER, priority=5)
@@ -12,9 +12,6 @@ class Config(BaseModel):
     
     # Tag names
     last_deployed_tag: str = "last-deployed"
-    
-    # NapCat API endpoint
-    napcat_api_base: str = ""
 
 
 plugin_config = get_plugin_config(Config)
@@ -1,42 +1,124 @@
 """
 Pytest configuration for NoneBot testing.
+
+Each pytest process (including every pytest-xdist worker) initializes its own
+NoneBot driver against a private, empty data directory. Async tests share
+one session event loop by default; set TEST_LOOP_SCOPE=module to give each test
+module its own loop, e.g. for ``pytest -n auto`` runs that don't touch the
+learning_chat database (its connections are opened on the session loop).
 """
 
+import functools
+import importlib
 import os
+import shutil
+import tempfile
 import pytest
 import nonebot
 from pathlib import Path
 from pytest_asyncio import is_async_test
+from nonebot.drivers import Driver
 from nonebug import NONEBOT_INIT_KWARGS
 
 # Set test environment
 os.environ["ENVIRONMENT"] = "test"
 
+# Plugins loaded for the session; set TEST_PLUGINS="" (or a comma-separated
+# list) to skip the learning_chat import chain when running pure unit tests.
+_TEST_PLUGINS = [
+    name.strip()
+    for name in os.environ.get("TEST_PLUGINS", "nonebot_plugin_learning_chat").split(",")
+    if name.strip()
+]
+
+_DRIVER_KEY = pytest.StashKey[Driver]()
+
+
+def _stashed_driver(config: pytest.Config) -> Driver:
+    """Look up the NoneBot driver once per session and keep it in the stash."""
+    if _DRIVER_KEY not in config.stash:
+        config.stash[_DRIVER_KEY] = nonebot.get_driver()
+    return config.stash[_DRIVER_KEY]
+
+
+# Resolved on first use so `pytest --collect-only` never imports the adapter
+_ADAPTER = None
+
+
+def _onebot_v11_adapter():
+    global _ADAPTER
+    if _ADAPTER is None:
+        _ADAPTER = importlib.import_module("nonebot.adapters.onebot.v11").Adapter
+    return _ADAPTER
+
+
+def pytest_sessionstart(session: pytest.Session):
+    """Import the adapter before collection starts importing test modules."""
+    # Done synchronously: several test modules import the adapter at module
+    # level, and importing one package from two threads at once is unsafe.
+    # Plugins are left to load_plugin: importing them before NoneBot is
+    # initialized would bypass plugin registration
+    if session.config.option.collectonly:
+        return
+    _onebot_v11_adapter()
+
+
+@functools.lru_cache(maxsize=None)
+def _load_plugin_once(plugin_name: str):
+    """Load a plugin once per process; NoneBot rejects loading it twice."""
+    return nonebot.load_plugin(plugin_name)
+
+
+_NONEBOT_INIT_KWARGS = {
+    "superusers": frozenset({"12345"}),  # Test superuser
+}
+
+
+def _make_data_dir() -> Path:
+    """Create an empty private data directory for this process."""
+    # "master" when not running under pytest-xdist
+    worker_id = os.environ.get("PYTEST_XDIST_WORKER", "master")
+    return Path(tempfile.mkdtemp(prefix=f"ttd-bot-test-{worker_id}-"))
+
 
 def pytest_configure(config: pytest.Config):
     """Configure NoneBot initialization for testing."""
-    # Use the existing data directory for database access
+    # Start from an empty data directory so startup hooks and tests never
+    # read or write the live one, and parallel workers each get their own
+    data_dir = _make_data_dir()
+    config.add_cleanup(lambda: shutil.rmtree(data_dir, ignore_errors=True))
     config.stash[NONEBOT_INIT_KWARGS] = {
-        "superusers": {"12345"},  # Test superuser
+        **_NONEBOT_INIT_KWARGS,
+        "localstore_data_dir": str(data_dir),
     }
 
 
+_LOOP_SCOPE_MARKER = pytest.mark.asyncio(loop_scope=os.environ.get("TEST_LOOP_SCOPE", "session"))
+
+
 def pytest_collection_modifyitems(items: list[pytest.Item]):
-    """Mark all async tests to use session scope."""
-    pytest_asyncio_tests = (item for item in items if is_async_test(item))
-    session_scope_marker = pytest.mark.asyncio(loop_scope="session")
-    for async_test in pytest_asyncio_tests:
-        async_test.add_marker(session_scope_marker, append=False)
+    """Run async tests on the event loop scope selected by TEST_LOOP_SCOPE."""
+    for item in items:
+        if is_async_test(item):
+            item.add_marker(_LOOP_SCOPE_MARKER, append=False)
 
 
 @pytest.fixture(scope="session", autouse=True)
-async def after_nonebot_init(after_nonebot_init: None):
+async def after_nonebot_init(after_nonebot_init: None, request: pytest.FixtureRequest):
     """Load adapters and plugins after NoneBot initialization."""
-    from nonebot.adapters.onebot.v11 import Adapter as OneBotV11Adapter
-
     # Register adapter
-    driver = nonebot.get_driver()
-    driver.register_adapter(OneBotV11Adapter)
+    driver = _stashed_driver(request.config)
+    adapter = _onebot_v11_adapter()
+    if adapter.get_name() not in nonebot.get_adapters():
+        driver.register_adapter(adapter)
+
+    # Load only the plugins selected by TEST_PLUGINS (learning_chat by default)
+    for plugin_name in _TEST_PLUGINS:
+        _load_plugin_once(plugin_name)
+
+
+@pytest.fixture
+def driver(request: pytest.FixtureRequest) -> Driver:
+    """The session's NoneBot driver."""
+    return _stashed_driver(request.config)
 
-    # Load only the learning_chat plugin for testing
-    nonebot.load_plugin("nonebot_plugin_learning_chat")
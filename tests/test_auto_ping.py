@@ -95,6 +95,44 @@ def test_match_targets_is_case_insensitive(auto_ping_modules, tmp_path):
     assert registry.match_targets("hello bob and ALICE and bob again") == {123456, 234567}
 
 
+def test_match_targets_reports_overlapping_aliases(auto_ping_modules, tmp_path):
+    _, storage, _ = auto_ping_modules
+    registry = storage.AliasRegistry(tmp_path / "aliases.json")
+
+    registry.add_alias(123456, "bob")
+    registry.add_alias(234567, "bobby")
+    registry.add_alias(345678, "ob")
+
+    assert registry.match_targets("BOBBY") == {123456, 234567, 345678}
+
+    registry.remove_alias("ob")
+    assert registry.match_targets("bobby") == {123456, 234567}
+
+
+def test_match_targets_prefilter_respects_casefold_expansion(auto_ping_modules, tmp_path):
+    _, storage, _ = auto_ping_modules
+    registry = storage.AliasRegistry(tmp_path / "aliases.json")
+
+    registry.add_alias(123456, "ss")
+    registry.add_alias(234567, "小明")
+
+    assert registry.match_targets("straße") == {123456}
+    assert registry.match_targets("找小明") == {234567}
+    assert registry.match_targets("nothing here") == set()
+
+
+def test_casefold_sources_are_built_only_once_aliases_exist(auto_ping_modules, tmp_path):
+    _, storage, _ = auto_ping_modules
+    storage._casefold_sources.cache_clear()
+
+    registry = storage.AliasRegistry(tmp_path / "aliases.json")
+    assert storage._casefold_sources.cache_info().currsize == 0
+
+    registry.add_alias(123456, "ss")
+    assert storage._casefold_sources.cache_info().currsize == 1
+    assert registry.match_targets("STRASSE") == {123456}
+
+
 def test_parse_add_args_supports_group_at(auto_ping_modules):
     _, _, helpers = auto_ping_modules
     args = Message([MessageSegment.at(123456), MessageSegment.text(" bob")])
@@ -165,3 +203,13 @@ def test_display_name_and_visibility_helpers(auto_ping_modules):
         },
         {123456},
     ) == [(123456, ("alice",))]
+
+
+def test_alias_matcher_finds_overlapping_aliases(auto_ping_modules):
+    _, storage, _ = auto_ping_modules
+
+    match = storage._build_alias_matcher({"bob": 1, "b": 1, "alice": 2, "lic": 3})
+
+    assert match("bobby and alice") == {1, 2, 3}
+    assert match("bob") == {1}
+    assert match("nothing here") == set()
@@ -0,0 +1,96 @@
+import importlib
+import json
+import sys
+from pathlib import Path
+
+import nonebot
+import pytest
+
+
+@pytest.fixture(scope="module")
+def user_storage_module():
+    try:
+        nonebot.get_driver()
+    except ValueError:
+        nonebot.init(superusers={"12345"})
+
+    try:
+        nonebot.load_plugin("nonebot_plugin_localstore")
+    except RuntimeError as exc:
+        if "Plugin already exists" not in str(exc):
+            raise
+
+    plugin_dir = Path(__file__).resolve().parents[1] / "src" / "plugins"
+    plugin_dir_text = str(plugin_dir)
+    if plugin_dir_text not in sys.path:
+        sys.path.insert(0, plugin_dir_text)
+
+    module_name = "auto_react.user_storage"
+    if module_name in sys.modules:
+        return importlib.reload(sys.modules[module_name])
+    return importlib.import_module(module_name)
+
+
+def test_user_storage_replays_log_on_reload(user_storage_module, tmp_path):
+    file_path = tmp_path / "users.json"
+
+    store = user_storage_module.UserStorage(file_path)
+    assert store.add_user("1") is True
+    assert store.add_user("2") is True
+    assert store.add_user("2") is False
+    assert store.remove_user("1") is True
+    assert store.log_path.read_text(encoding="utf-8") == "+1\n+2\n-1\n"
+
+    reloaded = user_storage_module.UserStorage(file_path)
+    assert reloaded.get_all_users() == {"2"}
+    assert reloaded.has_user("2") is True
+    assert json.loads(file_path.read_text(encoding="utf-8")) == ["2"]
+    assert not reloaded.log_path.exists()
+
+
+def test_user_storage_compacts_at_threshold(user_storage_module, tmp_path, monkeypatch):
+    monkeypatch.setattr(user_storage_module, "LOG_COMPACT_THRESHOLD", 3)
+    file_path = tmp_path / "users.json"
+
+    store = user_storage_module.UserStorage(file_path)
+    store.add_user("1")
+    store.add_user("2")
+    assert store.log_path.exists()
+    assert not file_path.exists()
+
+    store.add_user("3")
+    assert not store.log_path.exists()
+    assert json.loads(file_path.read_text(encoding="utf-8")) == ["1", "2", "3"]
+
+    store.remove_user("2")
+    assert store.log_path.read_text(encoding="utf-8") == "-2\n"
+    assert user_storage_module.UserStorage(file_path).get_all_users() == {"1", "3"}
+
+
+def test_user_storage_skips_malformed_log_lines(user_storage_module, tmp_path):
+    file_path = tmp_path / "users.json"
+    file_path.write_text(json.dumps(["1"]), encoding="utf-8")
+    file_path.with_suffix(".log").write_text("+2\ngarbage\n+\n-1\n", encoding="utf-8")
+
+    store = user_storage_module.UserStorage(file_path)
+
+    assert store.get_all_users() == {"2"}
+    assert json.loads(file_path.read_text(encoding="utf-8")) == ["2"]
+
+
+def test_user_storage_keeps_unreadable_log(user_storage_module, tmp_path):
+    file_path = tmp_path / "users.json"
+    file_path.write_text(json.dumps(["1"]), encoding="utf-8")
+    log_path = file_path.with_suffix(".log")
+    log_path.write_bytes(b"+2\n\xff\xfe\n")
+
+    store = user_storage_module.UserStorage(file_path)
+    assert store.get_all_users() == {"1"}
+    assert log_path.read_bytes() == b"+2\n\xff\xfe\n"
+    assert json.loads(file_path.read_text(encoding="utf-8")) == ["1"]
+
+    # Compacting later must not throw the unreplayed log away either
+    store.add_user("3")
+    store.compact()
+    assert log_path.read_bytes() == b"+2\n\xff\xfe\n+3\n"
+    assert json.loads(file_path.read_text(encoding="utf-8")) == ["1", "3"]
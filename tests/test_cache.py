@@ -10,14 +10,10 @@ This test file validates:
 6. File persistence
 """
 
-import pickle
 import tempfile
 import time
 from dataclasses import dataclass
 from pathlib import Path
-from unittest.mock import patch
-
-import pytest
 
 
 # Mock ChatMessage for testing
@@ -0,0 +1,191 @@
+import importlib
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import nonebot
+import pytest
+
+
+TZ_UTC8 = timezone(timedelta(hours=8))
+
+
+@pytest.fixture(scope="module")
+def statistics_module():
+    try:
+        driver = nonebot.get_driver()
+    except ValueError:
+        nonebot.init(superusers={"12345"})
+        driver = nonebot.get_driver()
+
+    from nonebot.adapters.onebot.v11 import Adapter
+
+    try:
+        driver.register_adapter(Adapter)
+    except ValueError:
+        pass
+
+    for plugin_name in ("nonebot_plugin_uninfo", "nonebot_plugin_chatrecorder"):
+        try:
+            nonebot.load_plugin(plugin_name)
+        except RuntimeError as exc:
+            if "Plugin already exists" not in str(exc):
+                raise
+
+    plugin_dir = Path(__file__).resolve().parents[1] / "src" / "plugins"
+    plugin_dir_text = str(plugin_dir)
+    if plugin_dir_text not in sys.path:
+        sys.path.insert(0, plugin_dir_text)
+
+    return importlib.import_module("chat_statistics.statistics")
+
+
+@pytest.fixture
+def chat_main_module(statistics_module):
+    module = importlib.import_module("chat_statistics.__main__")
+    module._statistics_cache.clear()
+    yield module
+    module._statistics_cache.clear()
+
+
+def _sample_times() -> list[datetime]:
+    return [
+        datetime(2025, 1, 1, 0, 30),  # naive, treated as UTC -> 08h
+        datetime(2025, 1, 1, 15, 59, 59, tzinfo=timezone.utc),  # 23h on 01-01
+        datetime(2025, 1, 1, 16, 0, 0, tzinfo=timezone.utc),  # 00h on 01-02
+        datetime(2025, 1, 2, 8, 15, tzinfo=TZ_UTC8),
+        datetime(2025, 1, 3, 8, 45, tzinfo=TZ_UTC8),
+        datetime(2025, 1, 3, 8, 50, tzinfo=TZ_UTC8),
+    ]
+
+
+def test_chat_add_messages_matches_add_message(statistics_module):
+    single = statistics_module.ChatStatistics("1", "2", 7)
+    batch = statistics_module.ChatStatistics("1", "2", 7)
+
+    for message_time in _sample_times():
+        single.add_message(message_time)
+    batch.add_messages(_sample_times())
+
+    assert batch.total_messages == single.total_messages == 6
+    expected = [0] * 24
+    expected[0], expected[8], expected[23] = 1, 4, 1
+    assert batch.hourly_distribution == single.hourly_distribution == expected
+
+
+def test_active_add_messages_counts_distinct_days(statistics_module):
+    single = statistics_module.ActiveStatistics("1", "2", 7)
+    batch = statistics_module.ActiveStatistics("1", "2", 7)
+
+    for message_time in _sample_times():
+        single.add_message(message_time)
+    batch.add_messages(_sample_times())
+
+    expected = [0] * 24
+    expected[0], expected[8], expected[23] = 1, 3, 1
+    assert batch.get_hourly_active_counts() == single.get_hourly_active_counts() == expected
+    assert batch.format_text_output("x") == single.format_text_output("x")
+
+
+def test_add_messages_accepts_empty_batch(statistics_module):
+    stats = statistics_module.ChatStatistics("1", "2", 7)
+    stats.add_messages([])
+
+    assert stats.total_messages == 0
+    assert stats.get_hourly_percentages() == [0.0] * 24
+    assert stats.format_text_output() == "过去7天无聊天记录"
+
+
+def test_add_hourly_count_shifts_utc_bucket_to_local_hour(statistics_module):
+    stats = statistics_module.ChatStatistics("1", "2", 7)
+
+    stats.add_hourly_count(datetime(2025, 1, 1, 16, tzinfo=timezone.utc), 5)
+    stats.add_hourly_count(datetime(2025, 1, 1, 3, tzinfo=timezone.utc), 2)
+
+    assert stats.total_messages == 7
+    assert stats.hourly_distribution[0] == 5
+    assert stats.hourly_distribution[11] == 2
+
+
+@pytest.mark.asyncio
+async def test_get_statistics_reuses_recent_results(chat_main_module, statistics_module, monkeypatch):
+    calls = []
+
+    async def fake_combined(user_id, group_id, days):
+        calls.append(user_id)
+        return (
+            statistics_module.ChatStatistics(user_id, group_id, days),
+            statistics_module.ActiveStatistics(user_id, group_id, days),
+        )
+
+    async def fake_chart(chat_stats, active_stats, user_display):
+        return user_display.encode()
+
+    async def fake_has_records(user_id, group_id, days):
+        return True
+
+    monkeypatch.setattr(chat_main_module, "has_message_records", fake_has_records)
+    monkeypatch.setattr(chat_main_module, "get_user_combined_statistics", fake_combined)
+    monkeypatch.setattr(chat_main_module, "generate_combined_chart", fake_chart)
+
+    first = await chat_main_module._get_statistics("1", "2", 7, "您")
+    second = await chat_main_module._get_statistics("1", "2", 7, "您")
+    other = await chat_main_module._get_statistics("1", "2", 7, "用户 1")
+
+    assert second is first
+    assert other.chart_bytes == "用户 1".encode()
+    assert calls == ["1", "1"]
+
+    monkeypatch.setattr(chat_main_module, "_STATISTICS_CACHE_TTL_SECONDS", -1)
+    chat_main_module._statistics_cache.clear()
+    await chat_main_module._get_statistics("1", "2", 7, "您")
+    await chat_main_module._get_statistics("1", "2", 7, "您")
+    assert len(calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_get_statistics_skips_fetch_without_records(chat_main_module, monkeypatch):
+    async def fake_has_records(user_id, group_id, days):
+        return False
+
+    async def unexpected(*args, **kwargs):
+        raise AssertionError("statistics should not be fetched")
+
+    monkeypatch.setattr(chat_main_module, "has_message_records", fake_has_records)
+    monkeypatch.setattr(chat_main_module, "get_user_combined_statistics", unexpected)
+    monkeypatch.setattr(chat_main_module, "generate_combined_chart", unexpected)
+
+    result = await chat_main_module._get_statistics("1", "2", 7, "您")
+
+    assert result.chart_bytes is None
+    assert result.chat_stats.format_text_output("您") == "您的过去7天无聊天记录"
+    assert result.active_stats.format_text_output("您") == "您的过去7天无活跃记录"
+
+
+def test_store_statistics_drops_expired_entries_and_caps_size(chat_main_module, statistics_module, monkeypatch):
+    monkeypatch.setattr(chat_main_module, "_STATISTICS_CACHE_MAX_SIZE", 2)
+    now = time.monotonic()
+
+    def store(user_display, expires_at):
+        entry = chat_main_module._StatisticsCacheEntry(
+            expires_at=expires_at,
+            chat_stats=statistics_module.ChatStatistics("1", "2", 7),
+            active_stats=statistics_module.ActiveStatistics("1", "2", 7),
+            chart_bytes=b"png",
+        )
+        chat_main_module._store_statistics(("1", "2", 7, user_display), entry)
+
+    def cached_displays():
+        return [key[3] for key in chat_main_module._statistics_cache]
+
+    store("a", now - 1)
+    store("b", now + 60)
+    assert cached_displays() == ["b"]
+
+    store("c", now + 60)
+    store("d", now + 60)
+    assert cached_displays() == ["c", "d"]
+
+    store("c", now + 60)
+    assert cached_displays() == ["d", "c"]
@@ -221,3 +221,30 @@ async def test_handle_ice_tea_neko_replies_with_image(easy_trigger_module, monke
 
     assert captured["message"].type == "image"
     assert captured["message"].data["file"].startswith("base64://")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("user_id", "duration", "expected"),
+    [
+        (1001, 600, "还能说话吗？"),
+        (42, 600, None),
+        (42, 0, "哥我知道错了"),
+        (1001, 0, None),
+    ],
+)
+async def test_handle_mute_replies_by_target_and_duration(
+    easy_trigger_module, monkeypatch, user_id, duration, expected
+):
+    captured = {}
+
+    async def fake_finish(*, message=None, **kwargs):
+        captured["message"] = message
+
+    monkeypatch.setattr(easy_trigger_module.mute_handler, "finish", fake_finish)
+    event = type("DummyEvent", (), {"user_id": user_id, "duration": duration})()
+    bot = type("DummyBot", (), {"self_id": "42"})()
+
+    await easy_trigger_module.handle_mute(event, bot)
+
+    assert captured.get("message") == expected
@@ -6,6 +6,7 @@ from types import SimpleNamespace
 
 import nonebot
 import pytest
+from nonebot.adapters.onebot.v11 import Message, MessageSegment
 
 
 @pytest.fixture(scope="module")
@@ -41,11 +42,14 @@ def mc_server_checker_module():
     else:
         module = importlib.import_module(module_name)
 
-    module._PLAYER_ONLINE_PLAYERS.clear()
-    module._PLAYER_LAST_OFFLINE_AT.clear()
+    module._PRESENCE.clear()
     return module
 
 
+def _text_event(text: str) -> SimpleNamespace:
+    return SimpleNamespace(message=Message(text), get_plaintext=lambda: text)
+
+
 def test_server_change_message_format(mc_server_checker_module):
     module = mc_server_checker_module
 
@@ -81,9 +85,9 @@ def test_match_query_trigger_accepts_case_insensitive_hsmc(
         },
     )
 
-    assert module._match_query_trigger(SimpleNamespace(get_plaintext=lambda: "hsmc")) is True
-    assert module._match_query_trigger(SimpleNamespace(get_plaintext=lambda: "HSMC")) is True
-    assert module._match_query_trigger(SimpleNamespace(get_plaintext=lambda: "HsMc")) is True
+    assert module._match_query_trigger(_text_event("hsmc")) is True
+    assert module._match_query_trigger(_text_event("HSMC")) is True
+    assert module._match_query_trigger(_text_event("HsMc")) is True
 
 
 def test_match_query_trigger_still_requires_exact_keyword(
@@ -101,8 +105,36 @@ def test_match_query_trigger_still_requires_exact_keyword(
         },
     )
 
-    assert module._match_query_trigger(SimpleNamespace(get_plaintext=lambda: "/hsmc")) is False
-    assert module._match_query_trigger(SimpleNamespace(get_plaintext=lambda: " hsmc ")) is True
+    assert module._match_query_trigger(_text_event("/hsmc")) is False
+    assert module._match_query_trigger(_text_event(" hsmc ")) is True
+
+
+def test_match_query_trigger_reads_text_around_other_segments(
+    mc_server_checker_module, monkeypatch
+):
+    module = mc_server_checker_module
+    monkeypatch.setattr(module, "load_presets", lambda: {})
+
+    image_only = Message(MessageSegment.image("https://example.com/a.png"))
+    mixed = Message(
+        [MessageSegment.image("https://example.com/a.png"), MessageSegment.text("信息")]
+    )
+
+    def unexpected_plaintext() -> str:
+        raise AssertionError("plaintext should not be assembled")
+
+    assert (
+        module._match_query_trigger(
+            SimpleNamespace(message=image_only, get_plaintext=unexpected_plaintext)
+        )
+        is False
+    )
+    assert (
+        module._match_query_trigger(
+            SimpleNamespace(message=mixed, get_plaintext=mixed.extract_plain_text)
+        )
+        is True
+    )
 
 
 def test_resolve_query_preset_returns_display_name_and_target(
@@ -252,7 +284,7 @@ def test_run_check_broadcasts_preset_changes_only_to_configured_groups(
     monkeypatch.setattr(module, "_check_server", fake_check_server)
     monkeypatch.setattr(module, "_send_group_message", fake_send_group_message)
     monkeypatch.setattr(module, "load_state", lambda: state)
-    monkeypatch.setattr(module, "save_state", lambda current_state: None)
+    monkeypatch.setattr(module, "mark_state_dirty", lambda: None)
     monkeypatch.setattr(module.time, "time", lambda: 1000.0)
 
     asyncio.run(
@@ -269,6 +301,54 @@ def test_run_check_broadcasts_preset_changes_only_to_configured_groups(
     ]
 
 
+def test_run_check_probes_shared_server_once_for_all_groups(
+    mc_server_checker_module,
+    monkeypatch,
+):
+    module = mc_server_checker_module
+    monkeypatch.setattr(module, "load_presets", lambda: {})
+
+    state = {
+        "groups": {
+            100: {"servers": {"shared.example:25565": {}}},
+            200: {"servers": {"shared.example:25565": {}, "b.example:25565": {}}},
+        }
+    }
+    checked_ips: list[str] = []
+    sent_messages: list[tuple[int, str]] = []
+
+    async def fake_check_server(ip: str):
+        checked_ips.append(ip)
+        return module.ServerCheckResult(ip=ip, online=True)
+
+    async def fake_send_group_message(group_id: int, message: str):
+        sent_messages.append((group_id, message))
+
+    monkeypatch.setattr(module, "_check_server", fake_check_server)
+    monkeypatch.setattr(module, "_send_group_message", fake_send_group_message)
+    monkeypatch.setattr(module, "load_state", lambda: state)
+    monkeypatch.setattr(module, "mark_state_dirty", lambda: None)
+    monkeypatch.setattr(module.time, "time", lambda: 1000.0)
+
+    asyncio.run(
+        module._run_check(
+            send_changes=True,
+            include_player_changes=False,
+            only_online_servers=False,
+        )
+    )
+
+    assert sorted(checked_ips) == ["b.example:25565", "shared.example:25565"]
+    assert sent_messages == [
+        (100, "[+] server shared.example:25565 | offline for: unknown"),
+        (
+            200,
+            "[+] server shared.example:25565 | offline for: unknown\n"
+            "[+] server b.example:25565 | offline for: unknown",
+        ),
+    ]
+
+
 def test_handle_status_broadcasts_preset_change_to_configured_groups(
     mc_server_checker_module,
     monkeypatch,
@@ -312,13 +392,18 @@ def test_handle_status_broadcasts_preset_change_to_configured_groups(
     monkeypatch.setattr(module, "_check_server", fake_check_server)
     monkeypatch.setattr(module, "_send_group_message", fake_send_group_message)
     monkeypatch.setattr(module, "load_state", lambda: state)
-    monkeypatch.setattr(module, "save_state", lambda current_state: None)
+    monkeypatch.setattr(module, "mark_state_dirty", lambda: None)
     monkeypatch.setattr(module.time, "time", lambda: 1000.0)
     monkeypatch.setattr(module.status_matcher, "finish", fake_finish)
 
     asyncio.run(
         module.handle_status(
-            SimpleNamespace(group_id=999, user_id=1, get_plaintext=lambda: "hsmc")
+            SimpleNamespace(
+                group_id=999,
+                user_id=1,
+                message=Message("hsmc"),
+                get_plaintext=lambda: "hsmc",
+            )
         )
     )
 
@@ -335,8 +420,7 @@ def test_run_check_broadcasts_preset_player_changes_to_configured_groups(
     monkeypatch,
 ):
     module = mc_server_checker_module
-    module._PLAYER_ONLINE_PLAYERS.clear()
-    module._PLAYER_LAST_OFFLINE_AT.clear()
+    module._PRESENCE.clear()
 
     monkeypatch.setattr(
         module,
@@ -363,6 +447,7 @@ def test_run_check_broadcasts_preset_player_changes_to_configured_groups(
     sent_messages: list[tuple[int, str]] = []
     call_count = 0
     times = iter([1000.0, 1300.0])
+    presence_times = iter([1000.0, 1300.0])
 
     async def fake_check_server(ip: str):
         nonlocal call_count
@@ -390,8 +475,9 @@ def test_run_check_broadcasts_preset_player_changes_to_configured_groups(
     monkeypatch.setattr(module, "_check_server", fake_check_server)
     monkeypatch.setattr(module, "_send_group_message", fake_send_group_message)
     monkeypatch.setattr(module, "load_state", lambda: state)
-    monkeypatch.setattr(module, "save_state", lambda current_state: None)
+    monkeypatch.setattr(module, "mark_state_dirty", lambda: None)
     monkeypatch.setattr(module.time, "time", lambda: next(times))
+    monkeypatch.setattr(module, "_presence_now", lambda: next(presence_times))
 
     asyncio.run(
         module._run_check(
@@ -418,10 +504,7 @@ def test_run_check_broadcasts_preset_player_changes_to_configured_groups(
 
 def test_player_diff_messages_with_partial_sample(mc_server_checker_module):
     module = mc_server_checker_module
-    module._PLAYER_ONLINE_PLAYERS.clear()
-    module._PLAYER_LAST_OFFLINE_AT.clear()
-    module._PLAYER_PENDING_JOINS.clear()
-    module._PLAYER_PENDING_LEAVES.clear()
+    module._PRESENCE.clear()
 
     ip = "b.example:25565"
     group_id = 123
@@ -470,10 +553,7 @@ def test_player_diff_messages_with_partial_sample(mc_server_checker_module):
 
 def test_player_diff_messages_ignore_names_with_spaces(mc_server_checker_module):
     module = mc_server_checker_module
-    module._PLAYER_ONLINE_PLAYERS.clear()
-    module._PLAYER_LAST_OFFLINE_AT.clear()
-    module._PLAYER_PENDING_JOINS.clear()
-    module._PLAYER_PENDING_LEAVES.clear()
+    module._PRESENCE.clear()
 
     ip = "c.example:25565"
     group_id = 456
@@ -485,7 +565,7 @@ def test_player_diff_messages_ignore_names_with_spaces(mc_server_checker_module)
         player_sample=["Alice", "Anonymous Player"],
     )
     assert module._build_player_diff_messages(group_id, first, now=1000.0) == []
-    assert module._PLAYER_ONLINE_PLAYERS[(group_id, ip)] == {"Alice": 1000.0}
+    assert module._PRESENCE[group_id][ip].online == {"Alice": 1000.0}
 
     leave = module.ServerCheckResult(
         ip=ip,
@@ -520,16 +600,14 @@ def test_format_online_result_ignores_names_with_spaces(mc_server_checker_module
 
     assert "Online players: Alice" in formatted
     assert "Anonymous Player" not in formatted
+    assert result.player_names == frozenset({"Alice"})
 
 
 def test_player_diff_messages_require_debounce_for_join_and_leave(
     mc_server_checker_module,
 ):
     module = mc_server_checker_module
-    module._PLAYER_ONLINE_PLAYERS.clear()
-    module._PLAYER_LAST_OFFLINE_AT.clear()
-    module._PLAYER_PENDING_JOINS.clear()
-    module._PLAYER_PENDING_LEAVES.clear()
+    module._PRESENCE.clear()
 
     ip = "d.example:25565"
     group_id = 789
@@ -571,13 +649,13 @@ def test_collect_group_servers_only_online(mc_server_checker_module):
     module = mc_server_checker_module
     state = {
         "groups": {
-            "100": {
+            100: {
                 "servers": {
                     "a.example:25565": {"last_status": "online"},
                     "b.example:25565": {"last_status": "offline"},
                 }
             },
-            "200": {
+            200: {
                 "servers": {
                     "c.example:25565": {"last_status": "online"},
                 }
@@ -598,6 +676,53 @@ def test_collect_group_servers_only_online(mc_server_checker_module):
     }
 
 
+def test_collect_group_servers_follows_status_flips_without_rescan(
+    mc_server_checker_module,
+    monkeypatch,
+):
+    module = mc_server_checker_module
+    monkeypatch.setattr(module, "_OFFLINE_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(module, "_ONLINE_SUCCESS_THRESHOLD", 1)
+    state = {
+        "groups": {
+            100: {
+                "servers": {
+                    "a.example:25565": {"last_status": "online"},
+                    "b.example:25565": {"last_status": "offline"},
+                }
+            },
+        }
+    }
+    assert module._collect_group_servers(state, only_online_servers=True) == {
+        100: ["a.example:25565"],
+    }
+
+    def fail_rescan(state):
+        raise AssertionError("index should not be rebuilt")
+
+    monkeypatch.setattr(module, "_rebuild_server_index", fail_rescan)
+    module._apply_status_update(
+        100,
+        state["groups"][100]["servers"]["a.example:25565"],
+        module.ServerCheckResult(ip="a.example:25565", online=False, error="timeout"),
+        1000.0,
+    )
+    module._apply_status_update(
+        100,
+        state["groups"][100]["servers"]["b.example:25565"],
+        module.ServerCheckResult(ip="b.example:25565", online=True),
+        1000.0,
+    )
+    module._index_remove_server(100, "a.example:25565")
+
+    assert module._collect_group_servers(state, only_online_servers=True) == {
+        100: ["b.example:25565"],
+    }
+    assert module._collect_group_servers(state, only_online_servers=False) == {
+        100: ["b.example:25565"],
+    }
+
+
 def test_apply_status_update_requires_consecutive_failures_to_mark_offline(
     mc_server_checker_module,
 ):
@@ -702,3 +827,138 @@ def test_apply_status_update_requires_consecutive_successes_to_mark_online(
     assert server_state["consecutive_successes"] == 5
     assert server_state["online_since"] == 1001.0
     assert server_state["last_seen_online_at"] == 1005.0
+
+
+def test_state_is_cached_and_flushed_only_when_dirty(
+    mc_server_checker_module, monkeypatch, tmp_path
+):
+    storage = importlib.import_module("mc_server_checker.storage")
+    data_file = tmp_path / "servers.json"
+    data_file.write_text('{"groups": {}}', encoding="utf-8")
+    monkeypatch.setattr(storage, "DATA_FILE", data_file)
+    monkeypatch.setattr(storage, "_STATE_CACHE", None)
+    monkeypatch.setattr(storage, "_STATE_DIRTY", False)
+
+    state = storage.load_state()
+    assert storage.load_state() is state
+    assert storage.flush_state() is False
+
+    assert storage.get_group_servers(state, 100) == {}
+    assert state == {"groups": {}}
+
+    assert storage.add_server(state, 100, "a.example:25565") is True
+    data_file.unlink()
+    assert storage.flush_state() is True
+    assert storage.flush_state() is False
+    assert '"100"' in data_file.read_text(encoding="utf-8")
+
+    storage._STATE_CACHE = None
+    asyncio.run(storage.preload_state())
+    assert storage._STATE_CACHE["groups"][100]["servers"] == {"a.example:25565": {}}
+    assert storage.load_state() is storage._STATE_CACHE
+
+
+def test_schedule_flush_coalesces_changes_into_one_atomic_write(
+    mc_server_checker_module, monkeypatch, tmp_path
+):
+    storage = importlib.import_module("mc_server_checker.storage")
+    data_file = tmp_path / "servers.json"
+    monkeypatch.setattr(storage, "DATA_FILE", data_file)
+    monkeypatch.setattr(storage, "_STATE_CACHE", {"groups": {}})
+    monkeypatch.setattr(storage, "_STATE_DIRTY", False)
+    monkeypatch.setattr(storage, "_FLUSH_TASK", None)
+    monkeypatch.setattr(storage, "_FLUSH_DELAY_SECONDS", 0.01)
+
+    writes = []
+    real_write_state = storage._write_state
+
+    def counting_write_state(payload):
+        writes.append(payload)
+        real_write_state(payload)
+
+    monkeypatch.setattr(storage, "_write_state", counting_write_state)
+
+    async def mutate_twice() -> None:
+        state = storage.load_state()
+        storage.add_server(state, 100, "a.example:25565")
+        storage.schedule_flush()
+        storage.add_server(state, 100, "b.example:25565")
+        storage.schedule_flush()
+        await storage._FLUSH_TASK
+
+    asyncio.run(mutate_twice())
+
+    assert len(writes) == 1
+    assert not data_file.with_suffix(".json.tmp").exists()
+    storage._STATE_CACHE = None
+    assert list(storage.load_state()["groups"][100]["servers"]) == [
+        "a.example:25565",
+        "b.example:25565",
+    ]
+
+
+def test_check_server_reuses_lookup_until_probe_fails(
+    mc_server_checker_module,
+    monkeypatch,
+):
+    module = mc_server_checker_module
+    module._JAVA_SERVER_CACHE.clear()
+    lookups: list[str] = []
+    status_error: list[Exception] = []
+
+    class FakeServer:
+        async def async_status(self):
+            if status_error:
+                raise status_error.pop()
+            return SimpleNamespace(
+                version=SimpleNamespace(name="1.21"),
+                description="motd",
+                players=SimpleNamespace(online=0, max=20, sample=None),
+                latency=12.3,
+            )
+
+    async def fake_lookup(ip, timeout):
+        lookups.append(ip)
+        return FakeServer()
+
+    monkeypatch.setattr(module.JavaServer, "async_lookup", fake_lookup)
+
+    first = asyncio.run(module._check_server("a.example"))
+    second = asyncio.run(module._check_server("a.example"))
+    assert first.online and second.online
+    assert lookups == ["a.example"]
+
+    status_error.append(OSError("refused"))
+    assert asyncio.run(module._check_server("a.example")).online is False
+    assert "a.example" not in module._JAVA_SERVER_CACHE
+    assert asyncio.run(module._check_server("a.example")).online is True
+    assert lookups == ["a.example", "a.example"]
+    module._JAVA_SERVER_CACHE.clear()
+
+
+def test_check_server_limits_concurrent_probes(mc_server_checker_module, monkeypatch):
+    module = mc_server_checker_module
+    module._JAVA_SERVER_CACHE.clear()
+    in_flight = 0
+    peak = 0
+
+    async def fake_lookup(ip, timeout):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        raise OSError("refused")
+
+    monkeypatch.setattr(module.JavaServer, "async_lookup", fake_lookup)
+
+    async def probe_all():
+        monkeypatch.setattr(module, "_PROBE_SEMAPHORE", asyncio.Semaphore(2))
+        return await asyncio.gather(
+            *[module._check_server(f"{index}.example") for index in range(6)]
+        )
+
+    results = asyncio.run(probe_all())
+
+    assert [result.online for result in results] == [False] * 6
+    assert peak == 2
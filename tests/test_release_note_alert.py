@@ -5,10 +5,11 @@ from types import SimpleNamespace
 
 import nonebot
 import pytest
+import pytest_asyncio
 
 
 @pytest.fixture(scope="module")
-def release_note_module():
+def _release_note_module():
     try:
         driver = nonebot.get_driver()
     except ValueError:
@@ -33,10 +34,40 @@ def release_note_module():
     else:
         module = importlib.import_module(module_name)
 
+    return module
+
+
+@pytest.fixture
+def release_note_module(_release_note_module):
+    module = _release_note_module
     module._ALERT_KEYS_SENT.clear()
+    module._RESPONSE_CACHE.clear()
+    module._PRIMARY_SUPERUSER = None
     return module
 
 
+@pytest_asyncio.fixture
+async def github_client(release_note_module, monkeypatch):
+    """Install a shared GitHub client whose requests go to a mock handler."""
+    import httpx
+
+    clients = []
+
+    def install(handler):
+        client = httpx.AsyncClient(
+            base_url=release_note_module.GITHUB_API_BASE,
+            transport=httpx.MockTransport(handler),
+        )
+        monkeypatch.setattr(release_note_module, "_HTTP_CLIENT", client)
+        clients.append(client)
+        return client
+
+    yield install
+
+    for client in clients:
+        await client.aclose()
+
+
 class FakeBot:
     def __init__(self):
         self.calls = []
@@ -56,13 +87,31 @@ def test_resolve_primary_superuser_prefers_env_order(release_note_module, monkey
 
     assert release_note_module._resolve_primary_superuser() == 1669790626
 
+    monkeypatch.setenv("SUPERUSERS", '["1777777777"]')
+    assert release_note_module._resolve_primary_superuser() == 1669790626
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    [
+        ('["1669790626", 1777777777]', ["1669790626", "1777777777"]),
+        ('"1669790626"', ["1669790626"]),
+        ("['1669790626', '1777777777']", ["1669790626", "1777777777"]),
+        ("(1669790626, 1777777777)", ["1669790626", "1777777777"]),
+        ("1669790626, 1777777777", ["1669790626", "1777777777"]),
+        ("  ", []),
+    ],
+)
+def test_parse_superusers_accepts_common_formats(release_note_module, value, expected):
+    assert release_note_module._parse_superusers(value) == expected
+
 
 def test_resolve_primary_superuser_fallback_driver(release_note_module, monkeypatch):
     monkeypatch.delenv("SUPERUSERS", raising=False)
     monkeypatch.setattr(
         release_note_module,
         "driver",
-        SimpleNamespace(config=SimpleNamespace(superusers={"1669790627", "1669790628"})),
+        SimpleNamespace(config=SimpleNamespace(superusers={"alice", "1669790628", " 1669790627 "})),
     )
 
     assert release_note_module._resolve_primary_superuser() == 1669790627
@@ -172,6 +221,15 @@ def test_format_release_note_normalizes_whitespace(release_note_module):
     assert result == "v1.4.18: 更新 发布标签 文案 (+1)"
 
 
+def test_format_release_note_only_reads_needed_part_of_long_tag_message(release_note_module):
+    tag_message = "修复 登录\n\n" + "正文 " * 10000
+    result = release_note_module.format_release_note("v1.4.18", tag_message, 3)
+
+    assert len(result) <= release_note_module.MAX_LONGNICK_LENGTH
+    assert result.startswith("v1.4.18: 修复 登录 正文 正文")
+    assert result.endswith("正文 (+3)")
+
+
 @pytest.mark.asyncio
 async def test_publish_release_note_treats_failed_retcode_as_failure(
     release_note_module, monkeypatch
@@ -214,9 +272,6 @@ async def test_check_and_publish_release_note_updates_tag_even_if_publish_fails(
     async def fake_publish_release_note(_release_note: str):
         return False
 
-    async def fake_get_github_token():
-        return "token"
-
     async def fake_update_tag(tag_name: str, commit_sha: str, token: str):
         update_calls.append((tag_name, commit_sha, token))
         return True
@@ -230,9 +285,249 @@ async def test_check_and_publish_release_note_updates_tag_even_if_publish_fails(
     )
     monkeypatch.setattr(release_note_module, "get_tag_message", fake_get_tag_message)
     monkeypatch.setattr(release_note_module, "publish_release_note", fake_publish_release_note)
-    monkeypatch.setattr(release_note_module, "get_github_token", fake_get_github_token)
+    monkeypatch.setattr(release_note_module, "_GITHUB_TOKEN", "token")
     monkeypatch.setattr(release_note_module, "update_tag", fake_update_tag)
 
     await release_note_module.check_and_publish_release_note()
 
     assert update_calls == [("last-deployed", "current-sha", "token")]
+
+
+@pytest.mark.asyncio
+async def test_github_calls_share_one_client(release_note_module, github_client):
+    import httpx
+
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append((request.method, request.url.path))
+        return httpx.Response(200, text="abc")
+
+    client = github_client(handler)
+
+    assert await release_note_module.get_tag_commit_sha("v1.0.0") == "abc"
+    assert await release_note_module.get_tag_commit_sha("v1.0.1") == "abc"
+    assert await release_note_module._get_client() is client
+    assert requested == [
+        ("GET", "/repos/trytodupe/ttd-bot/commits/refs/tags/v1.0.0"),
+        ("GET", "/repos/trytodupe/ttd-bot/commits/refs/tags/v1.0.1"),
+    ]
+
+    await release_note_module._close_client()
+    assert client.is_closed
+    assert release_note_module._HTTP_CLIENT is None
+
+
+@pytest.mark.asyncio
+async def test_get_version_tags_at_commit_dereferences_annotated_tags(
+    release_note_module, monkeypatch, github_client
+):
+    import httpx
+
+    base = release_note_module.GITHUB_API_BASE
+    refs = [
+        {"ref": "refs/tags/v1.0.0", "object": {"type": "commit", "sha": "target"}},
+        {"ref": "refs/tags/v1.0.1", "object": {"type": "tag", "sha": "t1", "url": f"{base}/git/tags/t1"}},
+        {"ref": "refs/tags/v0.9.0", "object": {"type": "tag", "sha": "t2", "url": f"{base}/git/tags/t2"}},
+        {"ref": "refs/tags/last-deployed", "object": {"type": "tag", "sha": "t3", "url": f"{base}/git/tags/t3"}},
+    ]
+    tag_objects = {"t1": "target", "t2": "older", "t3": "target"}
+    requested = []
+    monkeypatch.setattr(release_note_module, "_TAG_PAGE_SIZE", 2)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(request.url.path)
+        if request.url.path.endswith("/git/matching-refs/tags/v"):
+            page = int(request.url.params["page"])
+            return httpx.Response(200, json=refs[(page - 1) * 2 : page * 2])
+        tag_sha = request.url.path.rsplit("/", 1)[-1]
+        return httpx.Response(200, json={"object": {"sha": tag_objects[tag_sha]}})
+
+    github_client(handler)
+
+    tags = await release_note_module.get_version_tags_at_commit("target")
+
+    assert tags == ["v1.0.0", "v1.0.1"]
+    assert requested.count("/repos/trytodupe/ttd-bot/git/matching-refs/tags/v") == 3
+    assert not any(path.endswith("/t3") for path in requested)
+
+
+@pytest.mark.asyncio
+async def test_cached_get_revalidates_with_etag_and_invalidates_on_update(
+    release_note_module, monkeypatch, github_client
+):
+    import httpx
+
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append((request.method, request.headers.get("If-None-Match")))
+        if request.method == "DELETE":
+            return httpx.Response(204)
+        if request.method == "POST":
+            return httpx.Response(201)
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        assert request.headers["Accept"] == "application/vnd.github.sha"
+        assert request.url.path.endswith("/commits/refs/tags/last-deployed")
+        return httpx.Response(200, text="abc", headers={"ETag": '"v1"'})
+
+    github_client(handler)
+
+    assert await release_note_module.get_tag_commit_sha("last-deployed") == "abc"
+    assert await release_note_module.get_tag_commit_sha("last-deployed") == "abc"
+    assert requested == [("GET", None)]
+
+    monkeypatch.setattr(release_note_module, "_RESPONSE_CACHE_TTL_SECONDS", -1)
+    assert await release_note_module.get_tag_commit_sha("last-deployed") == "abc"
+    assert requested[-1] == ("GET", '"v1"')
+
+    assert await release_note_module.update_tag("last-deployed", "def", "token") is True
+    assert release_note_module._RESPONSE_CACHE == {}
+
+
+@pytest.mark.asyncio
+async def test_cached_get_keeps_recent_parsed_bodies(release_note_module, monkeypatch, github_client):
+    import httpx
+
+    monkeypatch.setattr(release_note_module, "_RESPONSE_CACHE_MAX", 2)
+    github_client(
+        lambda request: httpx.Response(200, json={"sha": request.url.path[-1]}, headers={"ETag": '"e"'})
+    )
+
+    for tag_sha in ("a", "b", "a", "c"):
+        response = await release_note_module._cached_get(f"/git/tags/{tag_sha}")
+        assert response.data == {"sha": tag_sha}
+
+    cache = release_note_module._RESPONSE_CACHE
+    assert [key.split()[0][-1] for key in cache] == ["a", "c"]
+    assert [entry[1:] for entry in cache.values()] == [('"e"', {"sha": "a"}), ('"e"', {"sha": "c"})]
+
+
+@pytest.mark.asyncio
+async def test_on_startup_runs_check_after_delay(release_note_module, monkeypatch):
+    calls = []
+
+    async def fake_check():
+        calls.append("checked")
+
+    monkeypatch.setattr(release_note_module, "STARTUP_CHECK_DELAY_SECONDS", 0)
+    monkeypatch.setattr(release_note_module, "check_and_publish_release_note", fake_check)
+
+    await release_note_module.on_startup()
+    await release_note_module._STARTUP_CHECK_TASK
+
+    assert calls == ["checked"]
+
+
+@pytest.mark.asyncio
+async def test_get_tag_commit_sha_treats_unknown_ref_as_missing(release_note_module, github_client):
+    import httpx
+
+    github_client(lambda request: httpx.Response(422, json={"message": "No commit found"}))
+
+    assert await release_note_module.get_tag_commit_sha("v0.0.0") is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    ("message", "expected"),
+    [
+        ("修复 登录\r\n\n很长的正文\n" * 50, "修复 登录"),
+        ("", "v1.0.0"),
+    ],
+)
+async def test_get_tag_message_uses_first_line_of_annotated_tag(
+    release_note_module, github_client, message, expected
+):
+    import httpx
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path.endswith("/git/refs/tags/v1.0.0"):
+            return httpx.Response(
+                200,
+                json={"object": {"type": "tag", "url": f"{release_note_module.GITHUB_API_BASE}/git/tags/t1"}},
+            )
+        return httpx.Response(200, json={"tag": "v1.0.0", "message": message})
+
+    github_client(handler)
+
+    assert await release_note_module.get_tag_message("v1.0.0") == expected
+
+
+@pytest.mark.parametrize(
+    ("status_code", "body_text", "expected"),
+    [
+        (401, '{"message": "Bad credentials"}', True),
+        (403, "<html>Resource not accessible by personal access token</html>", True),
+        (403, "API rate limit exceeded", False),
+        (401, None, False),
+        (500, "Bad credentials", False),
+    ],
+)
+def test_is_github_auth_failure(release_note_module, status_code, body_text, expected):
+    assert release_note_module._is_github_auth_failure(status_code, body_text) is expected
+
+
+@pytest.mark.asyncio
+async def test_send_private_alert_once_caps_remembered_keys(release_note_module, monkeypatch):
+    sent = []
+
+    async def fake_send(message: str):
+        sent.append(message)
+        return True
+
+    monkeypatch.setattr(release_note_module, "_send_private_alert", fake_send)
+    monkeypatch.setattr(release_note_module, "_ALERT_KEYS_SENT_MAX", 2)
+
+    for key in ("a", "b", "a", "c", "a"):
+        await release_note_module._send_private_alert_once(key, key)
+
+    assert sent == ["a", "b", "c", "a"]
+    assert list(release_note_module._ALERT_KEYS_SENT) == ["c", "a"]
+
+
+@pytest.mark.asyncio
+async def test_update_tag_accepts_any_success_status(release_note_module, github_client):
+    import httpx
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "DELETE":
+            return httpx.Response(204)
+        return httpx.Response(200, json={"ref": "refs/tags/last-deployed"})
+
+    github_client(handler)
+
+    assert await release_note_module.update_tag("last-deployed", "abc", "token") is True
+
+
+@pytest.mark.asyncio
+async def test_get_client_retries_failed_connections(release_note_module, monkeypatch):
+    import httpcore
+
+    class FlakyBackend(httpcore.AsyncMockBackend):
+        attempts = 0
+
+        async def connect_tcp(self, *args, **kwargs):
+            self.attempts += 1
+            if self.attempts == 1:
+                raise httpcore.ConnectError("connection refused")
+            return await super().connect_tcp(*args, **kwargs)
+
+    backend = FlakyBackend(
+        [b"HTTP/1.1 200 OK\r\n", b"Content-Length: 3\r\n", b"\r\n", b"abc"]
+    )
+    original_pool = httpcore.AsyncConnectionPool
+    monkeypatch.setattr(
+        httpcore,
+        "AsyncConnectionPool",
+        lambda **kwargs: original_pool(network_backend=backend, **kwargs),
+    )
+    monkeypatch.setattr(release_note_module, "_HTTP_CLIENT", None)
+
+    try:
+        assert await release_note_module.get_tag_commit_sha("v1.0.0") == "abc"
+    finally:
+        await release_note_module._close_client()
+
+    assert backend.attempts == 2